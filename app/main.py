@@ -1,13 +1,26 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.routes.v1 import event_routes as event_routes_v1
 from app.routes.v1 import auth_routes as auth_routes_v1
+from app.utils.cache import get_event_store
+from app.utils.http_cache import (
+    accepted_encodings,
+    cache_headers,
+    is_not_modified,
+    not_modified_response,
+    variant_etag,
+)
+from app.utils.snapshot import get_snapshot
 from starlette.responses import FileResponse
 import textwrap
 
+# La URL no lleva versión: los clientes pueden usar la copia unos minutos y
+# después revalidan con el ETag (304 si no ha cambiado).
+STATIC_EVENTS_CACHE_CONTROL = "public, max-age=300, stale-while-revalidate=86400"
+
 
 app = FastAPI(
     title="Comic Calendar API",
@@ -51,10 +64,33 @@ async def favicon():
     return FileResponse("app/static/FAVICON.png")
 
 
-# Ruta para servir un solo fichero estático
+# Ruta para servir todos los eventos de una vez. Se sirve una instantánea
+# minificada y precomprimida, generada una vez por versión de los datos.
 @app.get("/static-events", include_in_schema=False)
-async def static_file():
-    return FileResponse("events.json")
+async def static_file(request: Request):
+    store = await get_event_store()
+    snapshot = await get_snapshot(store)
+    if is_not_modified(request, snapshot.etag, snapshot.last_modified):
+        return not_modified_response(request, snapshot.etag, snapshot.last_modified)
+    accepted = accepted_encodings(request)
+    encoding = next(
+        (
+            name
+            for name in ("br", "gzip")
+            if name in accepted and name in snapshot.paths
+        ),
+        "identity",
+    )
+    headers = cache_headers(
+        variant_etag(snapshot.etag, encoding), snapshot.last_modified
+    )
+    headers["Cache-Control"] = STATIC_EVENTS_CACHE_CONTROL
+    headers["Vary"] = "Accept-Encoding"
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return FileResponse(
+        snapshot.paths[encoding], media_type="application/json", headers=headers
+    )
 
 
 @app.get("/", include_in_schema=False, response_class=HTMLResponse)
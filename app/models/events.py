@@ -36,3 +36,29 @@ class EventListResponse(BaseModel):
     total: int
     last_updated: datetime
     events: List[Event]
+    # Cursor para pedir la página siguiente; None en la última
+    next_cursor: Optional[str] = None
+
+
+class EventChangesResponse(BaseModel):
+    # Versión de los datos para pedir los siguientes cambios
+    version: int
+    last_updated: datetime
+    upserted: List[Event]
+    deleted: List[int]
+
+
+class EventPatch(EventMod):
+    id: int
+
+
+class BulkEventRequest(BaseModel):
+    create: List[EventMod] = []
+    update: List[EventPatch] = []
+    delete: List[int] = []
+
+
+class BulkEventResponse(BaseModel):
+    created: List[Event]
+    updated: List[Event]
+    deleted: List[int]
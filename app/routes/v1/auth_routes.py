@@ -1,7 +1,11 @@
 from fastapi import APIRouter, HTTPException, status, Depends
-from app.utils.file_operations import load_events, save_events
 from app.utils.validate_data import validate_province_and_community
-from app.models.events import Event, EventMod
+from app.models.events import (
+    BulkEventRequest,
+    BulkEventResponse,
+    Event,
+    EventMod,
+)
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta, datetime
 from app.models.users import Token, TokenData
@@ -12,7 +16,13 @@ from app.auth.auth import (
     verify_token,
     ACCESS_TOKEN_EXPIRE_MINUTES,
 )
-from app.utils.cache import reload_cached_events  # Importar desde cache.py
+from app.utils.cache import (  # Importar desde cache.py
+    persist_event_changes,
+    write_transaction,
+)
+from app.utils.event_record import valid_dates
+from app.utils.event_store import EventStore
+from app.utils.write_coordinator import allocate_ids
 import pytz
 
 router = APIRouter(prefix="/v1")
@@ -20,6 +30,20 @@ router = APIRouter(prefix="/v1")
 madrid_tz = pytz.timezone("Europe/Madrid")
 
 
+def invalid_dates_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid date format. Use YYYY-MM-DD or YYYY-MM-DD HH:MM:SS.",
+    )
+
+
+def upsert_event(store: EventStore, event: Event):
+    try:
+        store.upsert(event)
+    except ValueError:
+        raise invalid_dates_error()
+
+
 @router.post("/token", description="Create new token", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
     user = authenticate_user(form_data.username, form_data.password)
@@ -55,56 +79,39 @@ async def validate_token(token_data: TokenData = Depends(verify_token)):
     tags=["auth"],
 )
 async def update_event(event_id: int, event_update: EventMod):
-    events = await load_events()
-    event_index = None
-    for index, event in enumerate(events):
-        if event.id == event_id:
-            event_index = index
-            break
-    if event_index is None:
-        raise HTTPException(status_code=404, detail="Event not found")
-    event = events[event_index]
-
-    # Validar la provincia y la comunidad (si se actualizan)
-    if event_update.province is not None and event_update.community is not None:
-        if not validate_province_and_community(
-            event_update.province, event_update.community
-        ):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="La provincia no pertenece a la comunidad autónoma proporcionada.",
-            )
+    async with write_transaction() as store:
+        event = store.get(event_id)
+        if event is None:
+            raise HTTPException(status_code=404, detail="Event not found")
 
-    if event_update.summary is not None:
-        event.summary = event_update.summary
-    if event_update.start_date is not None:
-        event.start_date = event_update.start_date
-    if event_update.end_date is not None:
-        event.end_date = event_update.end_date
-    if event_update.description is not None:
-        event.description = event_update.description
-    if event_update.province is not None:
-        event.province = event_update.province
-    if event_update.community is not None:
-        event.community = event_update.community
-    if event_update.city is not None:
-        event.city = event_update.city
-    if event_update.type is not None:
-        event.type = event_update.type
-    if event_update.address is not None:
-        event.address = event_update.address
-    now_utc = datetime.now(pytz.utc)
-    now_madrid = now_utc.astimezone(madrid_tz)
-    event.update_date = now_madrid.strftime("%Y-%m-%d %H:%M:%S")
-    events[event_index] = event
-    try:
-        await save_events(events)
-        await reload_cached_events()  # Recargar los eventos en caché
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"Error al escribir en el archivo: {e}"
+        # Validar la provincia y la comunidad (si se actualizan)
+        if event_update.province is not None and event_update.community is not None:
+            if not validate_province_and_community(
+                event_update.province, event_update.community
+            ):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="La provincia no pertenece a la comunidad autónoma proporcionada.",
+                )
+
+        # Solo se modifican los campos recibidos; create_date no se actualiza
+        changes = event_update.dict(
+            exclude_none=True, exclude={"create_date", "update_date"}
         )
-    return event
+        now_utc = datetime.now(pytz.utc)
+        now_madrid = now_utc.astimezone(madrid_tz)
+        changes["update_date"] = now_madrid.strftime("%Y-%m-%d %H:%M:%S")
+        updated_event = event.model_copy(update=changes)
+        # Actualizamos la caché en memoria y después persistimos
+        upsert_event(store, updated_event)
+        try:
+            await persist_event_changes(upserted=[updated_event])
+        except Exception as e:
+            store.upsert(event)
+            raise HTTPException(
+                status_code=500, detail=f"Error al escribir en el archivo: {e}"
+            )
+        return updated_event
 
 
 @router.post(
@@ -122,26 +129,29 @@ async def create_event(event: EventMod):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="La provincia no pertenece a la comunidad autónoma proporcionada.",
         )
-    events = await load_events()
-    new_event_id = max((event.id for event in events), default=0) + 1
-
-    event_data = event.dict()
-    now_utc = datetime.now(pytz.utc)
-    now_madrid = now_utc.astimezone(madrid_tz)
-    event_data["create_date"] = now_madrid.strftime("%Y-%m-%d %H:%M:%S")
-    event_data["update_date"] = now_madrid.strftime("%Y-%m-%d %H:%M:%S")
-    new_event = Event(id=new_event_id, **event_data)
-    events.append(new_event)
-    try:
-        await save_events(events)
-        await reload_cached_events()  # Recargar los eventos en caché
-    except Exception as e:
-        print(f"Error al escribir en el archivo: {e}")
-        events.remove(new_event)
-        raise HTTPException(
-            status_code=500, detail=f"Error al escribir en el archivo: {e}"
-        )
-    return new_event
+    # Antes de reservar el id, que se perdería si el evento no es válido
+    if not valid_dates(event):
+        raise invalid_dates_error()
+    async with write_transaction() as store:
+        # Ids siempre crecientes, también entre workers
+        new_event_id = await allocate_ids(store.max_id() + 1)
+
+        event_data = event.dict()
+        now_utc = datetime.now(pytz.utc)
+        now_madrid = now_utc.astimezone(madrid_tz)
+        event_data["create_date"] = now_madrid.strftime("%Y-%m-%d %H:%M:%S")
+        event_data["update_date"] = now_madrid.strftime("%Y-%m-%d %H:%M:%S")
+        new_event = Event(id=new_event_id, **event_data)
+        upsert_event(store, new_event)
+        try:
+            await persist_event_changes(upserted=[new_event])
+        except Exception as e:
+            print(f"Error al escribir en el archivo: {e}")
+            store.remove(new_event.id)
+            raise HTTPException(
+                status_code=500, detail=f"Error al escribir en el archivo: {e}"
+            )
+        return new_event
 
 
 @router.delete(
@@ -152,21 +162,110 @@ async def create_event(event: EventMod):
     tags=["auth"],
 )
 async def delete_event(event_id: int):
-    events = await load_events()
-    event_index = next(
-        (index for index, event in enumerate(events) if event.id == event_id), None
-    )
+    async with write_transaction() as store:
+        now_madrid = datetime.now(pytz.utc).astimezone(madrid_tz)
+        # Se deja rastro del borrado para /v1/events/changes
+        event = store.remove(
+            event_id, deleted_at=now_madrid.strftime("%Y-%m-%d %H:%M:%S")
+        )
+        if event is None:
+            raise HTTPException(status_code=404, detail="Evento no encontrado")
 
-    if event_index is None:
-        raise HTTPException(status_code=404, detail="Evento no encontrado")
+        try:
+            await persist_event_changes(deleted=[event_id])
+        except Exception as e:
+            store.upsert(event)
+            raise HTTPException(
+                status_code=500, detail=f"Error al escribir en el archivo: {e}"
+            )
+        return {"message": "Evento eliminado con éxito"}
 
-    del events[event_index]
 
-    try:
-        await save_events(events)
-        await reload_cached_events()  # Recargar los eventos en caché
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"Error al escribir en el archivo: {e}"
+@router.post(
+    "/events/bulk",
+    response_model=BulkEventResponse,
+    dependencies=[Depends(get_current_user)],
+    description="Create, update and delete several events in a single write. "
+    "Either every change is applied or none is. Auth is required.",
+    tags=["auth"],
+)
+async def bulk_events(changes: BulkEventRequest):
+    async with write_transaction() as store:
+        now_madrid = datetime.now(pytz.utc).astimezone(madrid_tz)
+        now = now_madrid.strftime("%Y-%m-%d %H:%M:%S")
+
+        # Se valida todo el lote antes de modificar nada
+        event_ids = [patch.id for patch in changes.update] + changes.delete
+        if len(set(event_ids)) != len(event_ids):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Each event can only be updated or deleted once per request.",
+            )
+        missing = [event_id for event_id in event_ids if event_id not in store.by_id]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Events not found: {missing}")
+
+        updated = []
+        for patch in changes.update:
+            event = store.get(patch.id)
+            update = patch.dict(
+                exclude_none=True, exclude={"id", "create_date", "update_date"}
+            )
+            update["update_date"] = now
+            updated.append(event.model_copy(update=update))
+
+        # Los eventos nuevos llevan id 0 hasta que todo el lote es válido:
+        # un id reservado no se vuelve a usar aunque el lote se rechace
+        created = []
+        for offset, event in enumerate(changes.create):
+            event_data = event.dict()
+            event_data["create_date"] = now
+            event_data["update_date"] = now
+            try:
+                created.append(Event(id=0, **event_data))
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Missing fields in new event {offset}.",
+                )
+
+        labels = [f"nuevo evento {offset}" for offset in range(len(created))]
+        labels += [f"evento {event.id}" for event in updated]
+        for label, event in zip(labels, created + updated):
+            if not validate_province_and_community(event.province, event.community):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="La provincia no pertenece a la comunidad autónoma "
+                    f"proporcionada ({label}).",
+                )
+            if not valid_dates(event):
+                raise invalid_dates_error()
+
+        if created:
+            # Los ids nuevos se reservan de una vez
+            next_id = await allocate_ids(store.max_id() + 1, len(created))
+            created = [
+                event.model_copy(update={"id": next_id + offset})
+                for offset, event in enumerate(created)
+            ]
+
+        # Un único cambio de versión y una única escritura para todo el lote
+        try:
+            previous = store.apply_changes(created + updated, changes.delete, now)
+        except ValueError:
+            raise invalid_dates_error()
+        try:
+            await persist_event_changes(
+                upserted=created + updated, deleted=changes.delete
+            )
+        except Exception as e:
+            store.apply_changes(
+                [event for event in previous.values() if event is not None],
+                [event_id for event_id, event in previous.items() if event is None],
+            )
+            raise HTTPException(
+                status_code=500, detail=f"Error al escribir en el archivo: {e}"
+            )
+        return BulkEventResponse(
+            created=created, updated=updated, deleted=changes.delete
         )
-    return {"message": "Evento eliminado con éxito"}
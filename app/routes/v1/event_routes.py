@@ -1,15 +1,33 @@
-from fastapi import APIRouter, HTTPException, Query
-from datetime import datetime
-from app.models.events import Event, EventListResponse
-from app.utils.cache import get_cached_events  # Importar desde cache.py
-from unidecode import unidecode
-import os
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, List, Optional
+from app.models.events import Event, EventChangesResponse, EventListResponse
+from app.utils.cache import get_event_store  # Importar desde cache.py
+from app.utils.cursors import decode_cursor, encode_cursor
+from app.utils.event_record import EventRecord, materialize, parse_timestamp
+from app.utils.event_store import seek_before, start_date_key
+from app.utils.http_cache import (
+    cache_headers,
+    is_not_modified,
+    make_etag,
+    not_modified_response,
+)
+from app.utils.response_cache import cached_json_response, response_cache
+from app.utils.search_index import normalize
+from app.utils.search_index import intersect
+import pytz
 
 router = APIRouter(prefix="/v1")
-if os.path.exists("/code/events.json"):
-    events_file_path = "/code/events.json"
-else:  # Para correr los tests
-    events_file_path = "events.json"
+
+madrid_tz = pytz.timezone("Europe/Madrid")
+
+CURSOR_DESCRIPTION = (
+    "next_cursor returned by the previous page. Pages by key instead of "
+    "offset, so results do not shift when events are added or removed."
+)
+# Eventos que se serializan juntos en cada bloque de la exportación
+EXPORT_CHUNK_SIZE = 500
 
 
 def parse_datetime_or_date(value: str) -> datetime:
@@ -21,7 +39,8 @@ def parse_datetime_or_date(value: str) -> datetime:
             dt = datetime.strptime(value, fmt)
             if fmt == "%Y-%m-%d":
                 dt = dt.replace(hour=0, minute=0, second=0)
-            return dt
+            # Misma zona que las fechas de los eventos
+            return madrid_tz.localize(dt)
         except ValueError:
             continue
     raise HTTPException(
@@ -37,18 +56,170 @@ def parse_datetime_or_date(value: str) -> datetime:
     tags=["events"],
 )
 async def read_events(
-    limit: int = Query(20, ge=1, le=100), offset: int = Query(0, ge=0)
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    cursor: str = Query(None, description=CURSOR_DESCRIPTION),
 ):
-    events = await get_cached_events()
-    sorted_events = sorted(events, key=lambda event: event.id, reverse=True)
-    total_events = len(events)
-    modification_time = os.path.getmtime(events_file_path)
-    last_updated = datetime.utcfromtimestamp(modification_time).isoformat() + "Z"
-    return {
-        "total": total_events,
-        "last_updated": last_updated,
-        "events": sorted_events[offset : offset + limit],
-    }
+    cursor_key = parse_cursor("id", cursor)
+    store = await get_event_store()
+    cache_key = ("events", limit, offset, cursor)
+    etag = make_etag(store.version, cache_key)
+    if is_not_modified(request, etag, store.last_modified):
+        return not_modified_response(request, etag, store.last_modified)
+    entry = response_cache.get(store.version, cache_key)
+    if entry is None:
+        # Se pide un evento más para saber si hay página siguiente
+        if cursor_key is not None:
+            events = store.by_id_desc.page_before(cursor_key[0], limit + 1)
+        else:
+            events = store.page_by_id(offset, limit + 1)
+        response = EventListResponse(
+            total=len(store),
+            last_updated=store.last_updated,
+            events=materialize(events[:limit]),
+            next_cursor=next_cursor("id", events, limit, lambda event: (event.id,)),
+        )
+        entry = response_cache.put(
+            store.version, cache_key, response.model_dump_json().encode()
+        )
+    return cached_json_response(
+        request, entry, cache_headers(etag, store.last_modified)
+    )
+
+
+def parse_cursor(kind: str, cursor: Optional[str]) -> Optional[tuple]:
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(kind, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def next_cursor(
+    kind: str,
+    events: List[EventRecord],
+    limit: int,
+    key: Callable[[EventRecord], tuple],
+) -> Optional[str]:
+    """Cursor de la página siguiente; events trae un elemento de más si la hay."""
+    if len(events) <= limit:
+        return None
+    return encode_cursor(kind, key(events[limit - 1]))
+
+
+async def export_chunks(events: List[EventRecord], array: bool) -> AsyncIterator[str]:
+    """Serializa los eventos por bloques a medida que se envían."""
+    if array:
+        yield "["
+    separator = ""
+    for start in range(0, len(events), EXPORT_CHUNK_SIZE):
+        # Solo se crean los modelos del bloque que se está enviando
+        lines = [
+            event.to_event().model_dump_json()
+            for event in events[start : start + EXPORT_CHUNK_SIZE]
+        ]
+        if not lines:
+            continue
+        if array:
+            yield separator + ",".join(lines)
+            separator = ","
+        else:
+            yield "\n".join(lines) + "\n"
+    if array:
+        yield "]"
+
+
+@router.get(
+    "/events/export",
+    description=(
+        "Export all events sorted by id, streamed as NDJSON (one event per line) "
+        "or as a JSON array. Use updated_since / created_since to get only "
+        "the events changed since a date."
+    ),
+    tags=["events"],
+)
+async def export_events(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|json)$"),
+    updated_since: str = Query(None, description="YYYY-MM-DD or YYYY-MM-DD HH:MM:SS"),
+    created_since: str = Query(None, description="YYYY-MM-DD or YYYY-MM-DD HH:MM:SS"),
+):
+    store = await get_event_store()
+    etag = make_etag(store.version, ("export", format, updated_since, created_since))
+    if is_not_modified(request, etag, store.last_modified):
+        return not_modified_response(request, etag, store.last_modified)
+    # Los filtros salen de los índices por fecha, antes de empezar a enviar
+    selected_ids = intersect(
+        set(index.since(parse_datetime_or_date(value)))
+        for index, value in (
+            (store.updated, updated_since),
+            (store.created, created_since),
+        )
+        if value
+    )
+    # Solo se copian las referencias: los eventos no se modifican en sitio,
+    # así que la exportación ve una versión coherente aunque haya escrituras.
+    events = list(store.by_id_desc.events)
+    if selected_ids is not None:
+        events = [event for event in events if event.id in selected_ids]
+    array = format == "json"
+    return StreamingResponse(
+        export_chunks(events, array),
+        media_type="application/json" if array else "application/x-ndjson",
+        headers=cache_headers(etag, store.last_modified),
+    )
+
+
+@router.get(
+    "/events/changes",
+    response_model=EventChangesResponse,
+    description=(
+        "Events created, updated or deleted since a date (since, compared with "
+        "update_date) or since a dataset version (since_version, the version "
+        "returned by the previous call)."
+    ),
+    tags=["events"],
+)
+async def read_changes(
+    request: Request,
+    since: str = Query(None, description="YYYY-MM-DD or YYYY-MM-DD HH:MM:SS"),
+    since_version: int = Query(None, ge=0),
+):
+    if (since is None) == (since_version is None):
+        raise HTTPException(
+            status_code=400, detail="Use exactly one of since or since_version."
+        )
+    since_dt = parse_datetime_or_date(since) if since else None
+    store = await get_event_store()
+    etag = make_etag(store.version, ("changes", since, since_version))
+    if is_not_modified(request, etag, store.last_modified):
+        return not_modified_response(request, etag, store.last_modified)
+    changes = None
+    if since_version is not None:
+        changes = store.changed_since_version(since_version)
+        if changes is None:
+            # Versión anterior a la carga de los datos: las versiones son
+            # marcas de tiempo, así que seguimos por fecha de modificación.
+            # Las fechas guardadas no tienen fracciones de segundo: se
+            # redondea hacia abajo para no perder cambios del mismo segundo
+            # (a cambio de repetir alguno ya enviado).
+            since_dt = datetime.fromtimestamp(since_version // 10**9, timezone.utc)
+    if changes is None:
+        changes = store.changed_since(since_dt)
+    upserted, deleted = changes
+    response = EventChangesResponse(
+        version=store.version,
+        last_updated=store.last_updated,
+        upserted=materialize(upserted),
+        deleted=deleted,
+    )
+    return Response(
+        content=response.model_dump_json(),
+        media_type="application/json",
+        headers=cache_headers(etag, store.last_modified),
+    )
 
 
 @router.get(
@@ -58,8 +229,8 @@ async def read_events(
     tags=["events"],
 )
 async def read_event(event_id: int):
-    events = await get_cached_events()
-    event = next((event for event in events if event.id == event_id), None)
+    store = await get_event_store()
+    event = store.get(event_id)
     if event is None:
         raise HTTPException(status_code=404, detail="Event not found")
     return event
@@ -72,6 +243,7 @@ async def read_event(event_id: int):
     tags=["events"],
 )
 async def search_events(
+    request: Request,
     summary: str = None,
     province: str = None,
     community: str = None,
@@ -85,100 +257,104 @@ async def search_events(
     ),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: str = Query(None, description=CURSOR_DESCRIPTION),
 ):
-    events = await get_cached_events()
-    filtered_events = events
+    cursor_key = parse_cursor("start_date", cursor)
+    if cursor_key is not None:
+        # El cursor lleva la fecha como texto; se compara ya convertida
+        cursor_start = parse_timestamp(cursor_key[0])
+        if cursor_start is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        cursor_key = (cursor_start, cursor_key[1])
+    store = await get_event_store()
+    # Las búsquedas frecuentes se sirven ya serializadas
+    cache_key = (
+        "search",
+        normalize(summary) if summary else None,
+        normalize(province) if province else None,
+        normalize(community) if community else None,
+        normalize(city) if city else None,
+        type.lower() if type else None,
+        start_date,
+        end_date,
+        create_date,
+        limit,
+        offset,
+        cursor,
+    )
+    # Petición condicional: respondemos 304 sin filtrar ni serializar
+    etag = make_etag(store.version, cache_key)
+    if is_not_modified(request, etag, store.last_modified):
+        return not_modified_response(request, etag, store.last_modified)
+    headers = cache_headers(etag, store.last_modified)
+    entry = response_cache.get(store.version, cache_key)
+    if entry is not None:
+        return cached_json_response(request, entry, headers)
 
-    # --- Filtrar por fecha de creación ---
-    if create_date:
-        create_date_dt = parse_datetime_or_date(create_date)
-        filtered_events = [
-            event
-            for event in filtered_events
-            if create_date_dt
-            <= datetime.fromisoformat(event.create_date.replace("Z", ""))
-        ]
+    # --- Filtrar por provincia, comunidad, ciudad y tipo con los índices ---
+    candidate_ids = store.filter_ids(
+        province=province, community=community, city=city, type=type
+    )
     # --- Filtrar por rango de fechas ---
     if start_date or end_date:
-        if not start_date or not end_date:
-            # Calcular las fechas mínimas y máximas de los eventos disponibles en caso de no recibir start_date o end_date
-            event_dates = [
-                datetime.fromisoformat(event.start_date).date() for event in events
-            ] + [datetime.fromisoformat(event.end_date).date() for event in events]
-            min_date = min(event_dates)
-            max_date = max(event_dates)
-
-        if not start_date:
-            start_date_dt = min_date
-            print(start_date_dt)
-        else:
+        # Sin alguno de los extremos usamos las fechas mínima y máxima,
+        # precalculadas al cargar los eventos.
+        if start_date:
             start_date_dt = datetime.fromisoformat(start_date).date()
-            print(start_date_dt)
-
-        if not end_date:
-            end_date_dt = max_date
-            print(end_date_dt)
         else:
+            start_date_dt = store.dates.min_date
+        if end_date:
             end_date_dt = datetime.fromisoformat(end_date).date()
-            print(end_date_dt)
-
-        filtered_events = [
-            event
-            for event in filtered_events
-            if start_date_dt
-            <= datetime.fromisoformat(event.start_date).date()
-            <= end_date_dt
-            or start_date_dt
-            <= datetime.fromisoformat(event.end_date).date()
-            <= end_date_dt
-        ]
-
-    # --- Filtrar por otros campos ---
+        else:
+            end_date_dt = store.dates.max_date
+        if start_date_dt is None or end_date_dt is None:
+            date_ids = set()
+        else:
+            date_ids = store.dates.overlapping(start_date_dt, end_date_dt)
+        candidate_ids = intersect(
+            ids for ids in (candidate_ids, date_ids) if ids is not None
+        )
+    # --- Filtrar por fecha de creación con el índice ordenado ---
+    if create_date:
+        created_ids = set(store.created.since(parse_datetime_or_date(create_date)))
+        candidate_ids = intersect(
+            ids for ids in (candidate_ids, created_ids) if ids is not None
+        )
     if summary:
-        normalized_summary = unidecode(summary).lower()
-        filtered_events = [
-            event
-            for event in filtered_events
-            if normalized_summary in unidecode(event.summary).lower()
-        ]
-    if province:
-        normalized_province = unidecode(province).lower()
-        filtered_events = [
-            event
-            for event in filtered_events
-            if normalized_province in unidecode(event.province).lower()
-        ]
-    if community:
-        normalized_community = unidecode(community).lower()
-        filtered_events = [
-            event
-            for event in filtered_events
-            if normalized_community in unidecode(event.community).lower()
-        ]
-    if city:
-        normalized_city = unidecode(city).lower()
-        filtered_events = [
-            event
-            for event in filtered_events
-            if normalized_city in unidecode(event.city).lower()
-        ]
-    if type:
-        filtered_events = [
-            event for event in filtered_events if type.lower() in event.type.lower()
-        ]
-    if not filtered_events:
+        candidate_ids = store.filter_summary(summary, candidate_ids)
+    # Se pide un evento más para saber si hay página siguiente
+    if candidate_ids is None:
+        # Sin filtros paginamos directamente sobre la vista ordenada
+        total = len(store)
+        if cursor_key is not None:
+            events = store.by_start_date.page_before(cursor_key, limit + 1)
+        else:
+            events = store.by_start_date.page(offset, limit + 1)
+    else:
+        filtered_events = store.order_by_start_date(candidate_ids)
+        total = len(filtered_events)
+        if cursor_key is not None:
+            start = seek_before(filtered_events, start_date_key, cursor_key)
+        else:
+            start = offset
+        events = filtered_events[start : start + limit + 1]
+    if not total:
         raise HTTPException(
             status_code=404, detail="No events found for the given criteria"
         )
 
-    sorted_events = sorted(
-        filtered_events, key=lambda event: event.start_date, reverse=True
+    response = EventListResponse(
+        total=total,
+        last_updated=store.last_updated,
+        events=materialize(events[:limit]),
+        next_cursor=next_cursor(
+            "start_date",
+            events,
+            limit,
+            lambda event: (event.start_date, event.id),
+        ),
+    )
+    entry = response_cache.put(
+        store.version, cache_key, response.model_dump_json().encode()
     )
-    total_events = len(filtered_events)
-    modification_time = os.path.getmtime(events_file_path)
-    last_updated = datetime.utcfromtimestamp(modification_time).isoformat() + "Z"
-    return {
-        "total": total_events,
-        "last_updated": last_updated,
-        "events": sorted_events[offset : offset + limit],
-    }
+    return cached_json_response(request, entry, headers)
@@ -1,24 +1,250 @@
-from typing import List
-from datetime import datetime
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
 from app.models.events import Event
-from app.utils.file_operations import load_events
+from app.utils import event_archive, file_operations, write_coordinator
+from app.utils.event_archive import EventArchive
+from app.utils.event_record import FIELDS, EventRecord, load_archive
+from app.utils.event_store import EventStore, Tombstone, next_version
 
-# Variable global para almacenar los eventos
-cached_events: List[Event] = []
-events_last_loaded: datetime = None
+# Segundos mínimos entre dos comprobaciones de cambios en events.json
+CHECK_INTERVAL = 1.0
+# Segundos que se agrupan escrituras en el diario antes de consolidarlo
+COMPACTION_DELAY = 5.0
 
+# Variable global para almacenar los eventos y sus índices
+cached_store: Optional[EventStore] = None
+# Huella de events.json y su diario con la que se construyó la caché
+cached_fingerprint: Optional[tuple] = None
+# Contador de escrituras de todos los workers reflejado en la caché
+cached_change_count: Optional[int] = None
+last_checked: float = 0.0
+# Recarga en curso: todas las peticiones comparten la misma
+reload_task: Optional[asyncio.Task] = None
+# Se incrementa en cada escritura para descartar recargas que la pisarían
+write_generation = 0
+compaction_task: Optional[asyncio.Task] = None
 
-async def get_cached_events():
-    global cached_events, events_last_loaded
-    if not cached_events or (
-        events_last_loaded and (datetime.now() - events_last_loaded).seconds > 3600
-    ):
-        cached_events = await load_events()
-        events_last_loaded = datetime.now()
-    return cached_events
 
+def file_fingerprint(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
 
-async def reload_cached_events():
-    global cached_events, events_last_loaded
-    cached_events = await load_events()
-    events_last_loaded = datetime.now()
+
+def events_fingerprint() -> tuple:
+    return tuple(file_fingerprint(path) for path in file_operations.storage_paths())
+
+
+def archive_fingerprint(fingerprint: tuple) -> list:
+    # Tal como queda en los metadatos JSON de la instantánea
+    return [list(stat) if stat is not None else None for stat in fingerprint]
+
+
+def open_current_archive(fingerprint: tuple) -> Optional[EventArchive]:
+    """Instantánea binaria generada a partir de los ficheros actuales."""
+    try:
+        archive = EventArchive(file_operations.archive_file_path())
+    except (OSError, ValueError):
+        return None
+    if archive.fields != list(FIELDS) or archive.meta.get(
+        "fingerprint"
+    ) != archive_fingerprint(fingerprint):
+        archive.close()
+        return None
+    return archive
+
+
+def write_archive(fingerprint: tuple, version: int, records: List[EventRecord]):
+    meta = {"fingerprint": archive_fingerprint(fingerprint), "version": version}
+    try:
+        file_operations.write_atomic(
+            file_operations.archive_file_path(),
+            lambda f: event_archive.write_archive(
+                f, FIELDS, (record.values() for record in records), meta
+            ),
+        )
+    except OSError as e:
+        # Sin instantánea cada worker lee events.json por su cuenta
+        print(f"Error al escribir la instantánea binaria: {e}")
+
+
+async def save_archive(store: EventStore):
+    """Regenera la instantánea binaria tras reescribir events.json, para que
+    quien la lea (otros workers, notify, las gráficas) no tenga que volver
+    a leer el JSON."""
+    await asyncio.to_thread(
+        write_archive, cached_fingerprint, store.version, store.records
+    )
+
+
+def build_store() -> Tuple[tuple, EventStore]:
+    """Construye el almacén desde la instantánea binaria si está al día.
+
+    Con varios workers solo uno lee y valida events.json y escribe la
+    instantánea; todos la cargan ya convertida, sin JSON ni Pydantic, y
+    con la misma versión de los datos (y por tanto los mismos ETag). La
+    descripción y la dirección se quedan en el fichero mapeado hasta que
+    un evento se devuelve en una respuesta."""
+    tombstones = [
+        Tombstone(record["id"], record["deleted_at"], record["version"])
+        for record in file_operations.read_tombstones()
+    ]
+    # La huella se toma antes de leer: si el fichero cambia durante la
+    # lectura, la siguiente comprobación volverá a recargar.
+    fingerprint = events_fingerprint()
+    archive = open_current_archive(fingerprint)
+    if archive is None:
+        with write_coordinator.loader_lock():
+            # Otro worker puede haberla generado mientras esperábamos
+            fingerprint = events_fingerprint()
+            archive = open_current_archive(fingerprint)
+            if archive is None:
+                records = [
+                    EventRecord(event) for event in file_operations.read_stored_events()
+                ]
+                version = next_version()
+                write_archive(fingerprint, version, records)
+                # Se carga de la instantánea, igual que el resto de workers
+                archive = open_current_archive(fingerprint)
+    if archive is not None:
+        # Sin cerrarla: los registros leen de ella descripción y dirección
+        records = load_archive(archive)
+        version = archive.meta["version"]
+    # La fecha de modificación sale de la misma huella, sin otro stat
+    mtimes = [stat[2] for stat in fingerprint if stat is not None]
+    last_modified = max(mtimes) / 1e9 if mtimes else None
+    store = EventStore(
+        records=records,
+        last_modified=last_modified,
+        tombstones=tombstones,
+        version=version,
+    )
+    return fingerprint, store
+
+
+async def _reload(generation: int):
+    global cached_store, cached_fingerprint, cached_change_count
+    # Antes de leer, como la huella
+    change_count = write_coordinator.change_count()
+    try:
+        # La lectura y validación son síncronas: fuera del event loop
+        fingerprint, store = await asyncio.to_thread(build_store)
+    except Exception as e:
+        if cached_store is None:
+            raise
+        print(f"Error al recargar los eventos: {e}")
+        return
+    if generation != write_generation:
+        # Hubo una escritura durante la recarga; la próxima comprobación
+        # verá el fichero nuevo si hace falta.
+        return
+    # La caché se sustituye de una vez, nunca se ve a medio construir
+    cached_store, cached_fingerprint = store, fingerprint
+    cached_change_count = change_count
+
+
+def schedule_reload() -> asyncio.Task:
+    global reload_task
+    if reload_task is None or reload_task.done():
+        reload_task = asyncio.create_task(_reload(write_generation))
+    return reload_task
+
+
+def changed_by_other_worker() -> bool:
+    return (
+        cached_change_count is not None
+        and write_coordinator.change_count() != cached_change_count
+    )
+
+
+async def get_event_store() -> EventStore:
+    global last_checked
+    now = time.monotonic()
+    # Las escrituras de otros workers se ven en cada petición (el contador
+    # está mapeado en memoria); los cambios externos en el fichero, cada
+    # CHECK_INTERVAL segundos.
+    if cached_store is None:
+        last_checked = now
+        await schedule_reload()
+    elif changed_by_other_worker():
+        schedule_reload()
+    elif now - last_checked >= CHECK_INTERVAL:
+        last_checked = now
+        # Recargamos solo si events.json ha cambiado (p. ej. editado por
+        # otro proceso que comparte el volumen). Mientras tanto se sigue
+        # sirviendo la caché anterior.
+        if events_fingerprint() != cached_fingerprint:
+            schedule_reload()
+    return cached_store
+
+
+async def refresh_store():
+    """Recarga la caché ya, sin servir la versión anterior."""
+    global cached_store, cached_fingerprint, cached_change_count, write_generation
+    # Las recargas en curso quedan obsoletas
+    write_generation += 1
+    change_count = write_coordinator.change_count()
+    fingerprint, store = await asyncio.to_thread(build_store)
+    cached_store, cached_fingerprint = store, fingerprint
+    cached_change_count = change_count
+
+
+@asynccontextmanager
+async def write_transaction() -> AsyncIterator[EventStore]:
+    """Bloquea las escrituras del resto de peticiones y workers y devuelve
+    el almacén al día, con lo escrito por los demás.
+
+    Todo lo que se lee y se modifica dentro del bloque (incluida la
+    asignación de ids) es consistente hasta que se persiste."""
+    async with write_coordinator.write_lock():
+        store = await get_event_store()
+        if changed_by_other_worker() or events_fingerprint() != cached_fingerprint:
+            await refresh_store()
+            store = cached_store
+        yield store
+
+
+async def persist_event_changes(
+    upserted: Iterable[Event] = (), deleted: Iterable[int] = ()
+):
+    """Persiste en el diario cambios ya aplicados a la caché.
+
+    events.json se reescribe más tarde, en segundo plano, agrupando todas
+    las escrituras de ese intervalo. Se llama dentro de write_transaction."""
+    global cached_fingerprint, cached_change_count, write_generation
+    write_generation += 1
+    tombstones = [
+        cached_store.tombstones[event_id]._asdict()
+        for event_id in deleted
+        if event_id in cached_store.tombstones
+    ]
+    await file_operations.save_event_changes(upserted, deleted, tombstones)
+    cached_change_count = write_coordinator.notify_change()
+    cached_fingerprint = events_fingerprint()
+    schedule_compaction()
+
+
+async def _compact():
+    global cached_fingerprint
+    await asyncio.sleep(COMPACTION_DELAY)
+    try:
+        # Con varios workers, cualquiera puede consolidar: lo hace con los
+        # cambios de todos y sin escrituras a la vez.
+        async with write_transaction() as store:
+            await file_operations.compact_events(store.events)
+            cached_fingerprint = events_fingerprint()
+            await save_archive(store)
+    except Exception as e:
+        # El diario sigue siendo válido: se reintentará en la próxima escritura
+        print(f"Error al consolidar el diario de eventos: {e}")
+
+
+def schedule_compaction():
+    global compaction_task
+    if compaction_task is None or compaction_task.done():
+        compaction_task = asyncio.create_task(_compact())
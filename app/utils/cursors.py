@@ -0,0 +1,33 @@
+"""Cursores opacos para la paginación por clave.
+
+Un cursor codifica la clave del último evento devuelto (el id o la pareja
+(start_date, id)). La página siguiente empieza justo después de esa clave,
+de modo que las altas y bajas concurrentes no desplazan los resultados.
+"""
+
+import base64
+import json
+
+
+def encode_cursor(kind: str, key: tuple) -> str:
+    data = json.dumps([kind, *key], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_cursor(kind: str, cursor: str) -> tuple:
+    """Clave codificada en el cursor. Lanza ValueError si no es válido."""
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(data, list) or not data or data[0] != kind:
+        raise ValueError("Invalid cursor")
+    key = tuple(data[1:])
+    if kind == "id" and not (len(key) == 1 and isinstance(key[0], int)):
+        raise ValueError("Invalid cursor")
+    if kind == "start_date" and not (
+        len(key) == 2 and isinstance(key[0], str) and isinstance(key[1], int)
+    ):
+        raise ValueError("Invalid cursor")
+    return key
@@ -0,0 +1,151 @@
+"""Representación compacta de un evento en memoria.
+
+La caché guarda un EventRecord por evento en lugar del modelo de Pydantic:
+sin __dict__ por instancia, con los textos que se repiten entre eventos
+(provincia, ciudad, tipo, fechas...) compartidos con sys.intern y con las
+fechas ya convertidas. Los modelos Event solo se crean al construir las
+respuestas.
+
+Al cargar desde la instantánea binaria, la descripción y la dirección (los
+textos largos, que la búsqueda no usa) no se copian: el registro guarda su
+fila y se leen del fichero mapeado solo si el evento llega a una respuesta.
+"""
+
+import sys
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence
+from app.models.events import Event
+from app.utils.event_archive import EventArchive
+import pytz
+
+madrid_tz = pytz.timezone("Europe/Madrid")
+
+FIELDS = tuple(Event.model_fields)
+# Campos con pocos valores distintos: una sola copia de cada texto
+INTERNED_FIELDS = frozenset(
+    (
+        "start_date",
+        "end_date",
+        "create_date",
+        "update_date",
+        "province",
+        "community",
+        "city",
+        "type",
+    )
+)
+
+# Textos largos que se leen bajo demanda
+HEAVY_FIELDS = tuple(field for field in FIELDS if field in ("address", "description"))
+LIGHT_FIELDS = tuple(field for field in FIELDS if field not in HEAVY_FIELDS)
+
+
+@lru_cache(maxsize=65536)
+def parse_timestamp(value: str) -> Optional[datetime]:
+    """Fecha con zona horaria; None si no es válida.
+
+    Las fechas de los eventos se guardan sin zona en hora de Madrid. Los
+    eventos con la misma fecha comparten el objeto datetime."""
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = madrid_tz.localize(parsed)
+    return parsed
+
+
+def valid_dates(event: Event) -> bool:
+    """Si se pueden interpretar las fechas de inicio y fin del evento."""
+    return (
+        parse_timestamp(event.start_date) is not None
+        and parse_timestamp(event.end_date) is not None
+    )
+
+
+class EventRecord:
+    """Campos de Event más sus fechas convertidas (start, end, created,
+    updated), calculadas una sola vez por evento.
+
+    address y description están en _heavy: los textos, o bien el número de
+    fila en _source si el registro viene de una instantánea."""
+
+    __slots__ = LIGHT_FIELDS + (
+        "start",
+        "end",
+        "created",
+        "updated",
+        "_heavy",
+        "_source",
+    )
+
+    def __init__(self, event: Event):
+        for field in LIGHT_FIELDS:
+            value = getattr(event, field)
+            if field in INTERNED_FIELDS:
+                value = sys.intern(value)
+            setattr(self, field, value)
+        self._heavy = tuple(getattr(event, field) for field in HEAVY_FIELDS)
+        self._source: Optional[EventArchive] = None
+        self._parse_dates()
+
+    @classmethod
+    def from_archive(
+        cls, archive: EventArchive, row: int, values: Sequence
+    ) -> "EventRecord":
+        """Registro de la fila row de la instantánea, con los valores de
+        LIGHT_FIELDS ya leídos. Los datos se validaron al escribirla."""
+        record = cls.__new__(cls)
+        for field, value in zip(LIGHT_FIELDS, values):
+            setattr(record, field, value)
+        record._heavy = row
+        record._source = archive
+        record._parse_dates()
+        return record
+
+    def _parse_dates(self):
+        self.start = parse_timestamp(self.start_date)
+        self.end = parse_timestamp(self.end_date)
+        if self.start is None or self.end is None:
+            raise ValueError(f"Invalid dates in event {self.id}")
+        self.created = parse_timestamp(self.create_date)
+        self.updated = parse_timestamp(self.update_date)
+
+    def _heavy_field(self, position: int) -> str:
+        if self._source is None:
+            return self._heavy[position]
+        return self._source.field(self._heavy, HEAVY_FIELDS[position])
+
+    @property
+    def address(self) -> str:
+        return self._heavy_field(HEAVY_FIELDS.index("address"))
+
+    @property
+    def description(self) -> str:
+        return self._heavy_field(HEAVY_FIELDS.index("description"))
+
+    def to_event(self) -> Event:
+        # Los datos ya se validaron al crear el registro
+        return Event.model_construct(
+            **{field: getattr(self, field) for field in FIELDS}
+        )
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in FIELDS}
+
+    def values(self) -> tuple:
+        return tuple(getattr(self, field) for field in FIELDS)
+
+
+def materialize(records: Iterable[EventRecord]) -> List[Event]:
+    return [record.to_event() for record in records]
+
+
+def load_archive(archive: EventArchive) -> List[EventRecord]:
+    """Registros de todos los eventos de la instantánea, sin leer sus
+    textos largos."""
+    return [
+        EventRecord.from_archive(archive, row, values)
+        for row, values in enumerate(archive.columns(*LIGHT_FIELDS))
+    ]
@@ -0,0 +1,357 @@
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+from app.models.events import Event
+from app.utils.event_record import EventRecord, parse_timestamp
+from app.utils.search_index import (
+    DateIntervalIndex,
+    FieldIndex,
+    TimestampIndex,
+    TrigramIndex,
+    intersect,
+    normalize,
+)
+
+# Campos con índice invertido y su normalización
+INDEXED_FIELDS = {
+    "province": normalize,
+    "community": normalize,
+    "city": normalize,
+    "type": str.lower,
+}
+
+
+last_version = 0
+
+
+def next_version() -> int:
+    """Versión creciente de los datos, distinta entre reinicios del proceso."""
+    global last_version
+    last_version = max(last_version + 1, time.time_ns())
+    return last_version
+
+
+def reserve_version(version: int):
+    """Las versiones siguientes serán posteriores a version."""
+    global last_version
+    last_version = max(last_version, version)
+
+
+def id_key(record: EventRecord):
+    return record.id
+
+
+def start_date_key(record: EventRecord) -> Tuple[datetime, int]:
+    return (record.start, record.id)
+
+
+class Tombstone(NamedTuple):
+    """Rastro de un evento borrado, para sincronizar copias de los datos."""
+
+    id: int
+    deleted_at: str
+    version: int
+
+
+def seek_before(
+    events: List[EventRecord], key: Callable[[EventRecord], object], value
+) -> int:
+    """Posición del primer evento con clave menor que value en una lista
+    ordenada de forma descendente."""
+    low, high = 0, len(events)
+    while low < high:
+        middle = (low + high) // 2
+        if key(events[middle]) < value:
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+
+class SortedView:
+    """Eventos ordenados de forma descendente por una clave única.
+
+    Internamente se guardan en orden ascendente para poder insertar y
+    borrar con búsqueda binaria al modificar un único evento.
+    """
+
+    def __init__(self, events: List[EventRecord], key: Callable[[EventRecord], object]):
+        self.key = key
+        ordered = sorted(events, key=key)
+        self.keys = [key(event) for event in ordered]
+        self.events = ordered
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def __iter__(self) -> Iterator[EventRecord]:
+        return reversed(self.events)
+
+    def page(self, offset: int, limit: int) -> List[EventRecord]:
+        stop = len(self.events) - offset
+        if stop <= 0:
+            return []
+        return self.events[max(stop - limit, 0) : stop][::-1]
+
+    def page_before(self, key, limit: int) -> List[EventRecord]:
+        """Página de eventos con clave menor que key (siguiente al cursor)."""
+        stop = bisect_left(self.keys, key)
+        return self.events[max(stop - limit, 0) : stop][::-1]
+
+    def insert(self, event: EventRecord):
+        key = self.key(event)
+        position = bisect_left(self.keys, key)
+        self.keys.insert(position, key)
+        self.events.insert(position, event)
+
+    def remove(self, event: EventRecord):
+        position = bisect_left(self.keys, self.key(event))
+        del self.keys[position]
+        del self.events[position]
+
+
+class EventStore:
+    """Eventos en memoria con los índices que usan las rutas de lectura.
+
+    Se construye una vez por carga de events.json, de forma que las rutas no
+    tengan que ordenar ni recorrer la lista completa en cada petición. Las
+    escrituras actualizan los índices evento a evento con upsert/remove.
+
+    Guarda los eventos como EventRecord: get, upsert, remove y events
+    trabajan con modelos Event, mientras que las vistas y búsquedas
+    devuelven registros que las rutas convierten solo para la página.
+    """
+
+    def __init__(
+        self,
+        events: Iterable[Event] = (),
+        last_modified: Optional[float] = None,
+        tombstones: Iterable[Tombstone] = (),
+        records: Optional[List[EventRecord]] = None,
+        version: Optional[int] = None,
+    ):
+        """Con records se usan esos registros en lugar de convertir events.
+        Con version, la versión inicial es esa (la misma en todos los workers
+        que cargan la misma instantánea) en lugar de una nueva."""
+        if records is None:
+            records = [EventRecord(event) for event in events]
+        # Índice hash id -> evento, en el orden del fichero
+        self.by_id: Dict[int, EventRecord] = {record.id: record for record in records}
+        # Vistas preordenadas de forma descendente
+        self.by_id_desc = SortedView(records, id_key)
+        self.by_start_date = SortedView(records, start_date_key)
+        # Índices para la búsqueda
+        self.summaries = TrigramIndex()
+        self.indexes: Dict[str, FieldIndex] = {
+            field: FieldIndex(normalizer)
+            for field, normalizer in INDEXED_FIELDS.items()
+        }
+        self.dates = DateIntervalIndex()
+        self.created = TimestampIndex()
+        self.updated = TimestampIndex()
+        for record in records:
+            self._index(record)
+        self.touch(last_modified)
+        if version is not None:
+            self.version = version
+            reserve_version(version)
+        # Versión de la carga: los cambios posteriores se anotan en
+        # change_log como (versión, id), en orden creciente.
+        self.base_version = self.version
+        self.change_log: List[Tuple[int, int]] = []
+        # Último borrado de cada id que no ha vuelto a crearse
+        self.tombstones: Dict[int, Tombstone] = {
+            tombstone.id: tombstone
+            for tombstone in tombstones
+            if tombstone.id not in self.by_id
+        }
+
+    def touch(self, last_modified: Optional[float] = None):
+        """Nueva versión de los datos junto con su fecha de modificación.
+
+        Se calculan a la vez para que todas las respuestas de una misma
+        versión informen del mismo last_updated."""
+        self.version = next_version()
+        self.last_modified = time.time() if last_modified is None else last_modified
+        self.last_updated = datetime.fromtimestamp(self.last_modified, timezone.utc)
+
+    @property
+    def records(self) -> List[EventRecord]:
+        return list(self.by_id.values())
+
+    @property
+    def events(self) -> List[Event]:
+        return [record.to_event() for record in self.by_id.values()]
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def get(self, event_id: int) -> Optional[Event]:
+        record = self.by_id.get(event_id)
+        return record.to_event() if record is not None else None
+
+    def max_id(self) -> int:
+        return self.by_id_desc.events[-1].id if self.by_id else 0
+
+    def page_by_id(self, offset: int, limit: int) -> List[EventRecord]:
+        return self.by_id_desc.page(offset, limit)
+
+    def _index(self, event: EventRecord):
+        self.summaries.add(event.id, event.summary)
+        for field, index in self.indexes.items():
+            index.add(event.id, getattr(event, field))
+        self.dates.add(event.id, event.start.date(), event.end.date())
+        self.created.add(event.id, event.created)
+        self.updated.add(event.id, event.updated)
+
+    def _unindex(self, event: EventRecord):
+        self.summaries.remove(event.id)
+        for field, index in self.indexes.items():
+            index.remove(event.id, getattr(event, field))
+        self.dates.remove(event.id)
+        self.created.remove(event.id)
+        self.updated.remove(event.id)
+
+    def _put(self, record: EventRecord) -> Optional[EventRecord]:
+        previous = self.by_id.get(record.id)
+        if previous is not None:
+            self._drop(previous)
+        self.by_id[record.id] = record
+        self.by_id_desc.insert(record)
+        self.by_start_date.insert(record)
+        self._index(record)
+        self.tombstones.pop(record.id, None)
+        return previous
+
+    def _drop(self, record: EventRecord):
+        self.by_id_desc.remove(record)
+        self.by_start_date.remove(record)
+        self._unindex(record)
+
+    def upsert(self, event: Event) -> Optional[Event]:
+        """Inserta o sustituye un evento. Devuelve la versión anterior.
+
+        Los eventos guardados no se modifican nunca en sitio: las lecturas
+        en curso pueden seguir usando la versión anterior."""
+        # Validamos las fechas antes de tocar ningún índice
+        previous = self._put(EventRecord(event))
+        self.touch()
+        self.change_log.append((self.version, event.id))
+        return previous.to_event() if previous is not None else None
+
+    def remove(
+        self, event_id: int, deleted_at: Optional[str] = None
+    ) -> Optional[Event]:
+        """Borra un evento. Con deleted_at queda un rastro del borrado
+        (sin él, p. ej. al deshacer un alta, no se anota)."""
+        event = self.by_id.pop(event_id, None)
+        if event is not None:
+            self._drop(event)
+            self.touch()
+            if deleted_at is not None:
+                self.tombstones[event_id] = Tombstone(
+                    event_id, deleted_at, self.version
+                )
+            return event.to_event()
+        return None
+
+    def apply_changes(
+        self,
+        upserted: Iterable[Event] = (),
+        deleted: Iterable[int] = (),
+        deleted_at: Optional[str] = None,
+    ) -> Dict[int, Optional[Event]]:
+        """Aplica un lote de altas, modificaciones y borrados como una sola
+        versión de los datos.
+
+        Devuelve el estado anterior de cada id afectado (None si no
+        existía), con lo que se puede deshacer el lote. Si alguna fecha no
+        es válida se lanza ValueError sin haber modificado nada."""
+        records = [EventRecord(event) for event in upserted]
+        previous: Dict[int, Optional[Event]] = {}
+        for record in records:
+            old = self._put(record)
+            previous.setdefault(record.id, old.to_event() if old is not None else None)
+        removed = []
+        for event_id in deleted:
+            old = self.by_id.pop(event_id, None)
+            if old is not None:
+                self._drop(old)
+                previous.setdefault(event_id, old.to_event())
+                removed.append(event_id)
+        self.touch()
+        for record in records:
+            self.change_log.append((self.version, record.id))
+        if deleted_at is not None:
+            for event_id in removed:
+                self.tombstones[event_id] = Tombstone(
+                    event_id, deleted_at, self.version
+                )
+        return previous
+
+    def changed_since(self, since: datetime) -> Tuple[List[EventRecord], List[int]]:
+        """Eventos modificados y ids borrados desde una fecha."""
+        upserted = [self.by_id[event_id] for event_id in self.updated.since(since)]
+        deleted = [
+            tombstone.id
+            for tombstone in self.tombstones.values()
+            if (parse_timestamp(tombstone.deleted_at) or since) >= since
+        ]
+        return upserted, deleted
+
+    def changed_since_version(
+        self, version: int
+    ) -> Optional[Tuple[List[EventRecord], List[int]]]:
+        """Eventos modificados y ids borrados después de una versión.
+
+        Devuelve None si la versión es anterior a la carga de los datos: los
+        cambios de antes solo se conocen por fecha."""
+        if version < self.base_version:
+            return None
+        start = bisect_right(self.change_log, (version, float("inf")))
+        changed_ids = dict.fromkeys(event_id for _, event_id in self.change_log[start:])
+        upserted = [
+            self.by_id[event_id] for event_id in changed_ids if event_id in self.by_id
+        ]
+        deleted = [
+            tombstone.id
+            for tombstone in self.tombstones.values()
+            if tombstone.version > version
+        ]
+        return upserted, deleted
+
+    def filter_ids(self, **filters: Optional[str]) -> Optional[Set[int]]:
+        """Ids que cumplen todos los filtros de campos indexados.
+
+        Devuelve None si no se ha indicado ningún filtro."""
+        return intersect(
+            self.indexes[field].lookup(value)
+            for field, value in filters.items()
+            if value
+        )
+
+    def filter_summary(
+        self, summary: str, event_ids: Optional[Set[int]] = None
+    ) -> Set[int]:
+        return self.summaries.search(summary, event_ids)
+
+    def order_by_start_date(self, event_ids: Set[int]) -> List[EventRecord]:
+        """Eventos de event_ids en el orden de la vista por fecha de inicio."""
+        if len(event_ids) * 8 > len(self.by_id):
+            return [event for event in self.by_start_date if event.id in event_ids]
+        return sorted(
+            (self.by_id[event_id] for event_id in event_ids),
+            key=start_date_key,
+            reverse=True,
+        )
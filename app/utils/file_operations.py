@@ -1,24 +1,242 @@
-import json
-import datetime
-import pytz
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, List
 from app.models.events import Event
+from app.utils import serializer, sqlite_storage
 
-madrid_tz = pytz.timezone("Europe/Madrid")
+# Directorio de los datos: events.json y todos sus ficheros auxiliares
+# (diario, borrados, ids, cerrojos, events.db, events.bin). Con Docker se
+# monta el directorio entero, no los ficheros sueltos: así events.json se
+# puede sustituir de forma atómica y nada se pierde al recrear el contenedor.
+events_dir = os.getenv("EVENTS_DIR")
+if events_dir:
+    events_file_path = os.path.join(events_dir, "events.json")
+elif os.path.exists("/code/events.json"):
+    events_file_path = "/code/events.json"
+else:  # Para correr los tests
+    events_file_path = "events.json"
 
+# Backend de almacenamiento: "json" (events.json + diario) o "sqlite". Con
+# SQLite, events.json solo se exporta (para /static-events y los scripts):
+# no se vuelve a leer después de la migración inicial.
+storage_backend = os.getenv("EVENTS_STORAGE", "json")
+sqlite_file_path = os.getenv("EVENTS_DB", os.path.splitext(events_file_path)[0] + ".db")
 
-async def load_events():
-    with open("events.json", "r") as file:
-        events_data = json.load(file)
-        events = []
-        for event_data in events_data:
-            if "update_date" not in event_data:
-                event_data["update_date"] = datetime.datetime(
-                    1970, 1, 1, 0, 0, 0, tzinfo=madrid_tz
-                ).strftime("%Y-%m-%d %H:%M:%S")
-            events.append(Event(**event_data))
-        return events
+# Serializa las escrituras lanzadas desde distintos hilos
+write_lock = threading.Lock()
+last_sequence = 0
+last_written_sequence = 0
 
 
+def journal_file_path() -> str:
+    """Diario de cambios pendientes de consolidar en events.json."""
+    return events_file_path + ".journal"
+
+
+def tombstones_file_path() -> str:
+    """Registro de eventos borrados, para /v1/events/changes."""
+    return events_file_path + ".deleted"
+
+
+def archive_file_path() -> str:
+    """Instantánea binaria de los eventos (ver event_archive)."""
+    return os.path.splitext(events_file_path)[0] + ".bin"
+
+
+def storage_paths() -> List[str]:
+    """Ficheros cuyo cambio implica que hay que recargar los eventos."""
+    if storage_backend == "sqlite":
+        return [sqlite_file_path, sqlite_file_path + "-wal"]
+    return [events_file_path, journal_file_path()]
+
+
+def next_sequence() -> int:
+    """Número de secuencia creciente, también entre reinicios del proceso."""
+    global last_sequence
+    last_sequence = max(last_sequence + 1, time.time_ns())
+    return last_sequence
+
+
+def parse_event(event_data: dict) -> Event:
+    if "update_date" not in event_data:
+        event_data["update_date"] = serializer.DEFAULT_UPDATE_DATE
+    return Event(**event_data)
+
+
+def read_ndjson(path: str) -> List[dict]:
+    try:
+        file = open(path, "rb")
+    except FileNotFoundError:
+        return []
+    records = []
+    with file:
+        for line in file:
+            try:
+                records.append(serializer.loads(line))
+            except ValueError:
+                # Registro a medio escribir por una caída: se descarta
+                continue
+    return records
+
+
+def replay_journal(events: Dict[int, Event]):
+    records = read_ndjson(journal_file_path())
+    # Escrituras concurrentes pueden llegar al diario desordenadas
+    records.sort(key=lambda record: record["seq"])
+    for record in records:
+        if record["op"] == "upsert":
+            event = parse_event(record["event"])
+            events[event.id] = event
+        elif record["op"] == "delete":
+            events.pop(record["id"], None)
+
+
+def read_stored_events() -> List[Event]:
+    if storage_backend == "sqlite":
+        # Primer arranque con SQLite: migramos el events.json existente
+        if not os.path.exists(sqlite_file_path) and os.path.exists(events_file_path):
+            sqlite_storage.write_events(sqlite_file_path, read_events_file())
+        return sqlite_storage.read_events(sqlite_file_path)
+    return read_events_file()
+
+
+def read_events_file():
+    with open(events_file_path, "rb") as file:
+        # Validación de toda la lista de una vez
+        loaded = serializer.load_events(file.read())
+    events = {event.id: event for event in loaded}
+    replay_journal(events)
+    return list(events.values())
+
+
+def fsync_directory(directory: str):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_atomic(path: str, write):
+    """Escribe un fichero completo sin que nadie pueda verlo a medias.
+
+    Se escribe (en binario) en un temporal del mismo directorio, se hace
+    fsync y se renombra encima del original. Nunca se sobrescribe en sitio:
+    los lectores ven el fichero anterior o el nuevo completo (y quien tenga
+    events.bin mapeado sigue viendo su versión)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+        except FileNotFoundError:
+            os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+        fsync_directory(directory)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def trim_journal(sequence: int):
+    """Elimina del diario los registros ya incluidos en events.json."""
+    path = journal_file_path()
+    if not os.path.exists(path):
+        return
+    pending = []
+    with open(path, "rb") as file:
+        for line in file:
+            try:
+                if serializer.loads(line)["seq"] > sequence:
+                    pending.append(line)
+            except ValueError:
+                continue
+    write_atomic(path, lambda f: f.writelines(pending))
+
+
+def write_events_file(events, sequence: int):
+    global last_written_sequence
+    with write_lock:
+        # Si ya se ha escrito una versión posterior, esta está obsoleta
+        if sequence < last_written_sequence:
+            return
+        if storage_backend == "sqlite":
+            sqlite_storage.write_events(sqlite_file_path, events)
+        export_events_file(events)
+        trim_journal(sequence)
+        last_written_sequence = sequence
+
+
+def export_events_file(events):
+    write_atomic(
+        events_file_path, lambda f: f.write(serializer.dump_events(events, indent=4))
+    )
+
+
+def read_tombstones() -> List[dict]:
+    return read_ndjson(tombstones_file_path())
+
+
+def append_ndjson(path: str, records: List[dict]):
+    data = b"".join(serializer.dumps(record) + b"\n" for record in records)
+    with write_lock:
+        with open(path, "a+b") as f:
+            # Si una caída dejó un registro a medias, empezamos línea nueva
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    data = b"\n" + data
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+# La lectura y escritura del fichero son bloqueantes: se ejecutan en un hilo
+# para no detener el event loop mientras tanto.
 async def save_events(events):
-    with open("events.json", "w") as f:
-        json.dump([event.dict() for event in events], f, ensure_ascii=False, indent=4)
+    """Reescribe events.json completo y consolida el diario."""
+    await asyncio.to_thread(write_events_file, list(events), next_sequence())
+
+
+async def save_event_changes(
+    upserted: Iterable[Event] = (),
+    deleted: Iterable[int] = (),
+    tombstones: List[dict] = (),
+):
+    """Añade los cambios al diario sin reescribir events.json.
+
+    Los borrados se anotan además en el registro de borrados, que no se
+    consolida nunca."""
+    if storage_backend == "sqlite":
+        await asyncio.to_thread(
+            sqlite_storage.write_event_changes, sqlite_file_path, upserted, deleted
+        )
+    else:
+        records = [
+            {"seq": next_sequence(), "op": "upsert", "event": event.model_dump()}
+            for event in upserted
+        ] + [
+            {"seq": next_sequence(), "op": "delete", "id": event_id}
+            for event_id in deleted
+        ]
+        await asyncio.to_thread(append_ndjson, journal_file_path(), records)
+    if tombstones:
+        await asyncio.to_thread(append_ndjson, tombstones_file_path(), list(tombstones))
+
+
+async def compact_events(events):
+    """Consolida los cambios pendientes en events.json.
+
+    Con SQLite los datos ya están consolidados: solo se exporta el JSON."""
+    if storage_backend == "sqlite":
+        await asyncio.to_thread(export_events_file, list(events))
+    else:
+        await save_events(events)
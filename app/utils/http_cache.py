@@ -0,0 +1,83 @@
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Hashable, Set
+from fastapi import Request, Response
+
+
+def make_etag(version: int, key: Hashable = None) -> str:
+    """ETag fuerte a partir de la versión de los datos y la consulta."""
+    digest = hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+    return f'"{version:x}-{digest}"'
+
+
+# Sufijo del ETag de cada variante comprimida: deben ser distintos del de
+# la variante sin comprimir.
+ETAG_SUFFIXES = {"gzip": "-gz", "br": "-br"}
+
+
+def variant_etag(etag: str, encoding: str) -> str:
+    suffix = ETAG_SUFFIXES.get(encoding)
+    return etag if suffix is None else etag[:-1] + suffix + '"'
+
+
+def gzip_etag(etag: str) -> str:
+    return variant_etag(etag, "gzip")
+
+
+def accepted_encodings(request: Request) -> Set[str]:
+    """Codificaciones de Accept-Encoding que el cliente no rechaza con q=0."""
+    encodings = set()
+    for item in request.headers.get("Accept-Encoding", "").split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            encodings.add(name)
+    return encodings
+
+
+def http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
+
+
+def cache_headers(etag: str, last_modified: float) -> Dict[str, str]:
+    return {"ETag": etag, "Last-Modified": http_date(last_modified)}
+
+
+def is_not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    """Comprueba If-None-Match y, en su defecto, If-Modified-Since."""
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        accepted = {etag} | {variant_etag(etag, name) for name in ETAG_SUFFIXES}
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*" or tag.removeprefix("W/") in accepted:
+                return True
+        return False
+    if_modified_since = request.headers.get("If-Modified-Since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        # Las fechas HTTP no tienen fracciones de segundo
+        return int(last_modified) <= since
+    return False
+
+
+def not_modified_response(
+    request: Request, etag: str, last_modified: float
+) -> Response:
+    # El 304 lleva el ETag de la variante que tiene el cliente
+    if_none_match = request.headers.get("If-None-Match", "")
+    for encoding in ETAG_SUFFIXES:
+        if variant_etag(etag, encoding) in if_none_match:
+            etag = variant_etag(etag, encoding)
+            break
+    return Response(status_code=304, headers=cache_headers(etag, last_modified))
@@ -0,0 +1,67 @@
+import gzip
+from collections import OrderedDict
+from typing import Dict, Hashable, NamedTuple, Optional
+from fastapi import Request, Response
+from app.utils.http_cache import gzip_etag
+
+# Mismo umbral que GZipMiddleware en app/main.py
+GZIP_MINIMUM_SIZE = 1000
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    gzipped: Optional[bytes]
+
+
+class ResponseCache:
+    """Caché LRU de respuestas JSON ya serializadas (y comprimidas).
+
+    Solo guarda respuestas de una versión de los datos: en cuanto llega una
+    petición con otra versión (tras una recarga o una escritura) se vacía.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self.version: Optional[int] = None
+        self.entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+
+    def get(self, version: int, key: Hashable) -> Optional[CachedResponse]:
+        if version != self.version:
+            self.entries.clear()
+            self.version = version
+            return None
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, version: int, key: Hashable, body: bytes) -> CachedResponse:
+        gzipped = gzip.compress(body) if len(body) >= GZIP_MINIMUM_SIZE else None
+        entry = CachedResponse(body, gzipped)
+        if version == self.version:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+
+
+response_cache = ResponseCache()
+
+
+def cached_json_response(
+    request: Request, entry: CachedResponse, headers: Dict[str, str]
+) -> Response:
+    """Devuelve la variante comprimida si el cliente la acepta."""
+    if entry.gzipped is not None and "gzip" in request.headers.get(
+        "Accept-Encoding", ""
+    ):
+        headers = dict(headers)
+        if "ETag" in headers:
+            headers["ETag"] = gzip_etag(headers["ETag"])
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+        return Response(
+            content=entry.gzipped, media_type="application/json", headers=headers
+        )
+    return Response(content=entry.body, media_type="application/json", headers=headers)
@@ -0,0 +1,197 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from unidecode import unidecode
+
+
+def normalize(value: str) -> str:
+    """Normaliza un texto para búsquedas: sin acentos y en minúsculas."""
+    return unidecode(value).lower()
+
+
+class FieldIndex:
+    """Índice invertido de un campo: valor normalizado -> ids de eventos.
+
+    Los campos indexados (provincia, comunidad, ciudad, tipo) tienen pocos
+    valores distintos, así que una búsqueda por subcadena recorre las claves
+    del índice y no los eventos.
+    """
+
+    def __init__(self, normalizer: Callable[[str], str] = normalize):
+        self.normalizer = normalizer
+        self.postings: Dict[str, Set[int]] = defaultdict(set)
+
+    def add(self, event_id: int, value: str):
+        self.postings[self.normalizer(value)].add(event_id)
+
+    def remove(self, event_id: int, value: str):
+        key = self.normalizer(value)
+        ids = self.postings.get(key)
+        if ids is not None:
+            ids.discard(event_id)
+            if not ids:
+                del self.postings[key]
+
+    def lookup(self, query: str) -> Set[int]:
+        normalized_query = self.normalizer(query)
+        exact = self.postings.get(normalized_query)
+        result = set(exact) if exact else set()
+        for key, ids in self.postings.items():
+            if key != normalized_query and normalized_query in key:
+                result |= ids
+        return result
+
+
+def intersect(posting_lists: Iterable[Set[int]]) -> Optional[Set[int]]:
+    """Intersecta listas de posting empezando por la más corta.
+
+    Devuelve None si no se ha recibido ninguna lista (sin filtro)."""
+    posting_lists = sorted(posting_lists, key=len)
+    if not posting_lists:
+        return None
+    result = set(posting_lists[0])
+    for ids in posting_lists[1:]:
+        if not result:
+            break
+        result &= ids
+    return result
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """Índice de trigramas sobre textos normalizados.
+
+    Una búsqueda por subcadena intersecta las listas de posting de los
+    trigramas de la consulta y solo verifica con `in` a los candidatos.
+    """
+
+    def __init__(self):
+        self.texts: Dict[int, str] = {}
+        self.postings: Dict[str, Set[int]] = defaultdict(set)
+
+    def add(self, event_id: int, text: str):
+        normalized_text = normalize(text)
+        self.texts[event_id] = normalized_text
+        for gram in trigrams(normalized_text):
+            self.postings[gram].add(event_id)
+
+    def remove(self, event_id: int):
+        normalized_text = self.texts.pop(event_id, None)
+        if normalized_text is None:
+            return
+        for gram in trigrams(normalized_text):
+            ids = self.postings[gram]
+            ids.discard(event_id)
+            if not ids:
+                del self.postings[gram]
+
+    def search(self, query: str, event_ids: Optional[Set[int]] = None) -> Set[int]:
+        normalized_query = normalize(query)
+        posting_lists = [
+            self.postings.get(gram, set()) for gram in trigrams(normalized_query)
+        ]
+        if event_ids is not None:
+            posting_lists.append(event_ids)
+        candidates = intersect(posting_lists)
+        # Consultas de menos de tres caracteres: no hay trigramas que cruzar
+        if candidates is None:
+            candidates = self.texts
+        return {
+            event_id
+            for event_id in candidates
+            if normalized_query in self.texts[event_id]
+        }
+
+
+class DateIntervalIndex:
+    """Índice de intervalos [start_date, end_date] por ordinal de fecha.
+
+    Mantiene los ordinales de inicio y fin ordenados para responder con
+    búsqueda binaria qué eventos se solapan con un rango de fechas.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[int, date, date]] = ()):
+        self.bounds: Dict[int, Tuple[int, int]] = {}
+        for event_id, start, end in intervals:
+            self.bounds[event_id] = (start.toordinal(), end.toordinal())
+        self.starts: List[Tuple[int, int]] = sorted(
+            (start, event_id) for event_id, (start, _) in self.bounds.items()
+        )
+        self.ends: List[Tuple[int, int]] = sorted(
+            (end, event_id) for event_id, (_, end) in self.bounds.items()
+        )
+
+    @property
+    def min_date(self) -> Optional[date]:
+        if not self.bounds:
+            return None
+        return date.fromordinal(min(self.starts[0][0], self.ends[0][0]))
+
+    @property
+    def max_date(self) -> Optional[date]:
+        if not self.bounds:
+            return None
+        return date.fromordinal(max(self.starts[-1][0], self.ends[-1][0]))
+
+    def add(self, event_id: int, start: date, end: date):
+        start_ordinal, end_ordinal = start.toordinal(), end.toordinal()
+        self.bounds[event_id] = (start_ordinal, end_ordinal)
+        insort(self.starts, (start_ordinal, event_id))
+        insort(self.ends, (end_ordinal, event_id))
+
+    def remove(self, event_id: int):
+        bounds = self.bounds.pop(event_id, None)
+        if bounds is None:
+            return
+        start_ordinal, end_ordinal = bounds
+        del self.starts[bisect_left(self.starts, (start_ordinal, event_id))]
+        del self.ends[bisect_left(self.ends, (end_ordinal, event_id))]
+
+    def overlapping(self, start: date, end: date) -> Set[int]:
+        """Ids de los eventos que se solapan con [start, end] (inclusive)."""
+        start_ordinal, end_ordinal = start.toordinal(), end.toordinal()
+        # Empiezan antes del fin del rango: prefijo de starts
+        started = bisect_right(self.starts, (end_ordinal, float("inf")))
+        # Terminan después del inicio del rango: sufijo de ends
+        not_ended = bisect_left(self.ends, (start_ordinal, float("-inf")))
+        # Recorremos el lado más corto y comprobamos el otro extremo
+        if started <= len(self.ends) - not_ended:
+            return {
+                event_id
+                for _, event_id in self.starts[:started]
+                if self.bounds[event_id][1] >= start_ordinal
+            }
+        return {
+            event_id
+            for _, event_id in self.ends[not_ended:]
+            if self.bounds[event_id][0] <= end_ordinal
+        }
+
+
+class TimestampIndex:
+    """Ids ordenados por una fecha con hora (create_date, update_date)."""
+
+    def __init__(self):
+        self.values: Dict[int, datetime] = {}
+        self.entries: List[Tuple[datetime, int]] = []
+
+    def add(self, event_id: int, value: Optional[datetime]):
+        if value is None:
+            return
+        self.values[event_id] = value
+        insort(self.entries, (value, event_id))
+
+    def remove(self, event_id: int):
+        value = self.values.pop(event_id, None)
+        if value is None:
+            return
+        del self.entries[bisect_left(self.entries, (value, event_id))]
+
+    def since(self, value: datetime) -> List[int]:
+        """Ids con fecha igual o posterior a value, de más antigua a más nueva."""
+        start = bisect_left(self.entries, (value,))
+        return [event_id for _, event_id in self.entries[start:]]
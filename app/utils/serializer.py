@@ -0,0 +1,70 @@
+"""Lectura y escritura de JSON de eventos.
+
+Usa orjson si está instalado y, si no, el módulo json de la biblioteca
+estándar. La validación y la escritura de listas de eventos se hacen de una
+vez con un TypeAdapter de Pydantic en lugar de evento a evento.
+"""
+
+import json
+from typing import Any, Iterable, List, Optional, Union
+from pydantic import TypeAdapter
+from app.models.events import Event
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+EVENT_LIST = TypeAdapter(List[Event])
+
+# Pydantic valida y serializa sin soltar el GIL: trabajando por bloques, el
+# event loop sigue atendiendo peticiones mientras un hilo lee o guarda.
+CHUNK_SIZE = 1000
+
+# Valor de update_date para eventos antiguos que no lo tienen
+DEFAULT_UPDATE_DATE = "1970-01-01 00:00:00"
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(value: Any) -> bytes:
+    """JSON compacto en UTF-8."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def validate_events(items: List[dict]) -> List[Event]:
+    for item in items:
+        if "update_date" not in item:
+            item["update_date"] = DEFAULT_UPDATE_DATE
+    events = []
+    for start in range(0, len(items), CHUNK_SIZE):
+        events.extend(EVENT_LIST.validate_python(items[start : start + CHUNK_SIZE]))
+    return events
+
+
+def load_events(data: Union[bytes, str]) -> List[Event]:
+    return validate_events(loads(data))
+
+
+def dump_events(events: Iterable[Event], indent: Optional[int] = None) -> bytes:
+    """Mismo formato que json.dump(..., ensure_ascii=False, indent=indent)."""
+    events = list(events)
+    if len(events) <= CHUNK_SIZE:
+        return EVENT_LIST.dump_json(events, indent=indent)
+    # Cada bloque es una lista completa: se quitan sus corchetes y se unen
+    strip = 2 if indent else 1
+    parts = [
+        EVENT_LIST.dump_json(events[start : start + CHUNK_SIZE], indent=indent)[
+            strip:-strip
+        ]
+        for start in range(0, len(events), CHUNK_SIZE)
+    ]
+    if indent:
+        return b"[\n" + b",\n".join(parts) + b"\n]"
+    return b"[" + b",".join(parts) + b"]"
@@ -0,0 +1,156 @@
+"""Instantánea de todos los eventos para /static-events.
+
+Por cada versión de los datos se genera una sola vez el JSON minificado y
+sus variantes comprimidas (.gz y, si está instalado brotli, .br). Las
+peticiones sirven después el fichero que corresponda sin volver a
+serializar ni comprimir.
+
+Cada worker escribe en su propio subdirectorio: todos comparten la versión
+de los datos y, por tanto, los nombres de los ficheros, y un worker no debe
+borrar los que otro está sirviendo. Los subdirectorios de workers que ya no
+existen se borran al generar la primera instantánea.
+"""
+
+import asyncio
+import gzip
+import os
+import shutil
+import tempfile
+from typing import Dict, List, NamedTuple, Optional, Set
+from app.utils.event_record import EventRecord
+from app.utils.event_store import EventStore
+from app.utils import serializer
+from app.utils.http_cache import make_etag
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+snapshot_dir = os.getenv(
+    "EVENTS_SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "comic-calendar")
+)
+
+BROTLI_QUALITY = 5
+
+SUFFIXES = {"identity": ".json", "gzip": ".json.gz", "br": ".json.br"}
+
+
+class Snapshot(NamedTuple):
+    version: int
+    etag: str
+    last_modified: float
+    # Content-Encoding -> fichero ("identity" para el JSON sin comprimir)
+    paths: Dict[str, str]
+
+
+current: Optional[Snapshot] = None
+build_task: Optional[asyncio.Task] = None
+# Nombres de las instantáneas escritas por este proceso
+written: Set[str] = set()
+
+
+def process_dir() -> str:
+    return os.path.join(snapshot_dir, str(os.getpid()))
+
+
+def process_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # En Windows os.kill(pid, 0) no comprueba, envía CTRL_C
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # Existe, pero es de otro usuario
+        return True
+    return True
+
+
+def remove_orphan_dirs():
+    """Borra los directorios de workers terminados (reinicios, caídas): cada
+    uno guarda una copia completa de los eventos."""
+    try:
+        names = os.listdir(snapshot_dir)
+    except FileNotFoundError:
+        return
+    for name in names:
+        if name.isdigit() and int(name) != os.getpid() and not process_alive(int(name)):
+            shutil.rmtree(os.path.join(snapshot_dir, name), ignore_errors=True)
+
+
+def write_file(path: str, content: bytes):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    with os.fdopen(fd, "wb") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def remove_old_snapshots(keep: set):
+    # Solo los ficheros generados por este proceso. Se conserva también la
+    # versión anterior: puede haber respuestas enviándola todavía.
+    directory = process_dir()
+    for name in written - keep:
+        for suffix in SUFFIXES.values():
+            try:
+                os.remove(os.path.join(directory, name + suffix))
+            except FileNotFoundError:
+                pass
+    written.intersection_update(keep)
+
+
+def build_snapshot(
+    version: int,
+    last_modified: float,
+    records: List[EventRecord],
+    previous_version: int,
+) -> Snapshot:
+    if not written:
+        # Primera instantánea de este proceso
+        remove_orphan_dirs()
+    directory = process_dir()
+    os.makedirs(directory, exist_ok=True)
+    body = serializer.dumps([record.to_dict() for record in records])
+    variants = {"identity": body, "gzip": gzip.compress(body, compresslevel=9)}
+    if brotli is not None:
+        # Calidad media: la 11 tarda segundos con muchos eventos y se repite
+        # en cada worker tras cada escritura, para ganar muy poco tamaño.
+        variants["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+    name = f"events-{version:x}"
+    paths = {}
+    for encoding, content in variants.items():
+        paths[encoding] = os.path.join(directory, name + SUFFIXES[encoding])
+        write_file(paths[encoding], content)
+    written.add(name)
+    remove_old_snapshots({name, f"events-{previous_version:x}"})
+    return Snapshot(version, make_etag(version), last_modified, paths)
+
+
+async def _build(store: EventStore):
+    global current
+    # Los datos se toman en el event loop: el almacén no cambia a mitad
+    previous_version = current.version if current is not None else 0
+    snapshot = await asyncio.to_thread(
+        build_snapshot,
+        store.version,
+        store.last_modified,
+        store.records,
+        previous_version,
+    )
+    if current is None or snapshot.version > current.version:
+        current = snapshot
+
+
+async def get_snapshot(store: EventStore) -> Snapshot:
+    """Instantánea del almacén, generándola si está desfasada.
+
+    Como las recargas de la caché, la generación es única aunque lleguen
+    varias peticiones a la vez, y mientras tanto se sigue sirviendo la
+    instantánea anterior. Solo se espera si todavía no hay ninguna."""
+    global build_task
+    if current is None or current.version < store.version:
+        if build_task is None or build_task.done():
+            build_task = asyncio.create_task(_build(store))
+        if current is None:
+            await build_task
+    return current
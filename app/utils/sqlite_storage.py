@@ -0,0 +1,112 @@
+"""Almacenamiento de eventos en SQLite.
+
+Alternativa a events.json + diario: cada escritura es una transacción sobre
+una fila. Se activa con la variable de entorno EVENTS_STORAGE=sqlite.
+
+Las búsquedas se siguen resolviendo con los índices en memoria de la caché,
+así que la tabla solo se indexa por id. events.json pasa a ser una
+exportación: se sobrescribe tras cada escritura y lo que se edite en él a
+mano no se carga.
+
+Migración desde events.json:
+
+    python -m app.utils.sqlite_storage migrate events.json events.db
+"""
+
+import sqlite3
+import sys
+from typing import Iterable, List
+from app.models.events import Event
+from app.utils.serializer import EVENT_LIST, load_events
+
+COLUMNS = list(Event.model_fields)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    summary TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    create_date TEXT NOT NULL,
+    update_date TEXT NOT NULL,
+    province TEXT NOT NULL,
+    community TEXT NOT NULL,
+    city TEXT NOT NULL,
+    type TEXT NOT NULL,
+    address TEXT NOT NULL,
+    description TEXT NOT NULL
+);
+"""
+
+UPSERT = "INSERT INTO events ({}) VALUES ({}) ON CONFLICT (id) DO UPDATE SET {}".format(
+    ", ".join(COLUMNS),
+    ", ".join("?" for _ in COLUMNS),
+    ", ".join(f"{column} = excluded.{column}" for column in COLUMNS[1:]),
+)
+
+
+def connect(path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(path, timeout=30)
+    # WAL permite leer mientras otro proceso escribe
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def event_row(event: Event) -> tuple:
+    return tuple(getattr(event, column) for column in COLUMNS)
+
+
+def read_events(path: str) -> List[Event]:
+    connection = connect(path)
+    try:
+        cursor = connection.execute(
+            "SELECT {} FROM events ORDER BY id".format(", ".join(COLUMNS))
+        )
+        return EVENT_LIST.validate_python([dict(zip(COLUMNS, row)) for row in cursor])
+    finally:
+        connection.close()
+
+
+def write_events(path: str, events: Iterable[Event]):
+    """Sustituye todos los eventos en una única transacción."""
+    connection = connect(path)
+    try:
+        with connection:
+            connection.execute("DELETE FROM events")
+            connection.executemany(UPSERT, (event_row(event) for event in events))
+    finally:
+        connection.close()
+
+
+def write_event_changes(
+    path: str, upserted: Iterable[Event] = (), deleted: Iterable[int] = ()
+):
+    connection = connect(path)
+    try:
+        with connection:
+            connection.executemany(UPSERT, (event_row(event) for event in upserted))
+            connection.executemany(
+                "DELETE FROM events WHERE id = ?",
+                ((event_id,) for event_id in deleted),
+            )
+    finally:
+        connection.close()
+
+
+def migrate_from_json(json_path: str, path: str) -> int:
+    """Carga events.json en la base de datos. Devuelve los eventos migrados."""
+    with open(json_path, "rb") as file:
+        events = load_events(file.read())
+    write_events(path, events)
+    return len(events)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "migrate":
+        total = migrate_from_json(sys.argv[2], sys.argv[3])
+        print(f"{total} eventos migrados a {sys.argv[3]}")
+    else:
+        print("Uso: python -m app.utils.sqlite_storage migrate events.json events.db")
+        sys.exit(1)
@@ -0,0 +1,147 @@
+"""Coordinación de las escrituras entre peticiones y entre workers.
+
+Cada escritura se hace con dos cerrojos: uno de asyncio, que ordena las
+peticiones del mismo proceso, y un flock sobre events.json.lock, que ordena
+los distintos workers de uvicorn que comparten los ficheros. Bajo ellos se
+reparten también los ids de los eventos nuevos.
+
+Tras cada escritura se incrementa un contador compartido (events.json.changes,
+mapeado en memoria). Los demás workers lo comparan en cada petición y
+recargan en cuanto cambia, sin esperar a la comprobación periódica.
+"""
+
+import asyncio
+import mmap
+import os
+import struct
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional
+from app.utils import file_operations
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se coordina dentro del proceso
+    fcntl = None
+
+COUNTER = struct.Struct("<Q")
+
+# Se crea al primer uso, ya dentro del event loop
+_lock: Optional[asyncio.Lock] = None
+# Contador de cambios mapeado, por ruta
+_counters: Dict[str, mmap.mmap] = {}
+
+
+def lock_file_path() -> str:
+    return file_operations.events_file_path + ".lock"
+
+
+def ids_file_path() -> str:
+    """Último id asignado, para no repetir ids aunque se borre el mayor."""
+    return file_operations.events_file_path + ".ids"
+
+
+def changes_file_path() -> str:
+    return file_operations.events_file_path + ".changes"
+
+
+def get_lock() -> asyncio.Lock:
+    global _lock
+    if _lock is None:
+        _lock = asyncio.Lock()
+    return _lock
+
+
+@asynccontextmanager
+async def write_lock():
+    """Cerrojo exclusivo de escritura, dentro del proceso y entre procesos."""
+    async with get_lock():
+        if fcntl is None:
+            yield
+            return
+        fd = os.open(lock_file_path(), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Otro worker está escribiendo: esperamos fuera del event loop
+                await asyncio.to_thread(fcntl.flock, fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            # Cerrar el descriptor libera el flock
+            os.close(fd)
+
+
+@contextmanager
+def loader_lock():
+    """Cerrojo entre workers para generar la instantánea binaria: solo uno
+    lee events.json y el resto espera (bloqueante, se usa en un hilo)."""
+    if fcntl is None:
+        yield
+        return
+    fd = os.open(
+        file_operations.archive_file_path() + ".lock", os.O_RDWR | os.O_CREAT, 0o644
+    )
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def reserve_ids(min_id: int, count: int) -> int:
+    path = ids_file_path()
+    try:
+        with open(path) as f:
+            last_id = int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        last_id = 0
+    first_id = max(last_id + 1, min_id)
+    file_operations.write_atomic(
+        path, lambda f: f.write(str(first_id + count - 1).encode())
+    )
+    return first_id
+
+
+async def allocate_ids(min_id: int, count: int = 1) -> int:
+    """Reserva count ids consecutivos y devuelve el primero.
+
+    Los ids siempre crecen: parten del mayor entre el siguiente al último
+    asignado y min_id. Debe llamarse con write_lock adquirido."""
+    return await asyncio.to_thread(reserve_ids, min_id, count)
+
+
+def _counter() -> Optional[mmap.mmap]:
+    path = changes_file_path()
+    counter = _counters.get(path)
+    if counter is None:
+        try:
+            fd = os.open(path, os.O_RDWR)
+        except FileNotFoundError:
+            return None
+        try:
+            if os.fstat(fd).st_size < COUNTER.size:
+                return None
+            counter = mmap.mmap(fd, COUNTER.size)
+        finally:
+            os.close(fd)
+        _counters[path] = counter
+    return counter
+
+
+def change_count() -> int:
+    """Número de escrituras hechas por cualquier worker (0 si ninguna)."""
+    counter = _counter()
+    return COUNTER.unpack_from(counter)[0] if counter is not None else 0
+
+
+def notify_change() -> int:
+    """Anota una escritura para el resto de workers. Se llama con
+    write_lock adquirido; devuelve el nuevo valor del contador."""
+    counter = _counter()
+    if counter is None:
+        with open(changes_file_path(), "ab") as f:
+            f.truncate(COUNTER.size)
+        counter = _counter()
+    value = COUNTER.unpack_from(counter)[0] + 1
+    COUNTER.pack_into(counter, 0, value)
+    return value
@@ -1,9 +1,14 @@
 import json
 import os
 import subprocess
+import sys
 import argparse
+from datetime import datetime
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from app.utils.validate_data import validate_province_and_community  # noqa: E402
+
 # Cargar variables de entorno
 dotenv_path = os.path.join(os.path.dirname(__file__), '..', '.env')
 load_dotenv(dotenv_path)
@@ -11,12 +16,18 @@ load_dotenv(dotenv_path)
 # URL del servidor y endpoint de autenticación
 server_url = os.getenv("SERVER_URL")
 auth_endpoint = f'{server_url}/token'
-events_endpoint = f'{server_url}/events/'
+bulk_endpoint = f'{server_url}/events/bulk'
 
 # Credenciales autenticación
 username = os.getenv("USER_API")
 password = os.getenv("PASSWORD_API")
 
+# Campos obligatorios de un evento nuevo (las fechas de alta las pone la API)
+required_fields = (
+    'summary', 'start_date', 'end_date', 'province', 'community',
+    'city', 'type', 'address', 'description'
+)
+
 # Obtener el token de acceso
 def get_access_token():
     response = subprocess.run(
@@ -39,34 +50,78 @@ def get_access_token():
         print(f"Error decodificando JSON: {e}")
         return None
 
-# Enviar evento
-def send_event(event, token):
-    if 'id' in event:
-        del event['id']
-        
-    print(json.dumps(event))
+def valid_date(value):
+    # Mismo criterio que la API: fecha ISO, con o sin hora
+    try:
+        datetime.fromisoformat(value.replace('Z', '+00:00'))
+        return True
+    except (AttributeError, ValueError):
+        return False
+
+# Motivos por los que la API rechazaría el evento (lista vacía si es válido)
+def event_errors(event):
+    errors = [f"falta {field}" for field in required_fields if event.get(field) is None]
+    for field in ('start_date', 'end_date'):
+        if event.get(field) is not None and not valid_date(event[field]):
+            errors.append(f"fecha no válida en {field}: {event[field]}")
+    if not validate_province_and_community(event.get('province'), event.get('community')):
+        errors.append(
+            f"la provincia {event.get('province')} no pertenece a {event.get('community')}"
+        )
+    return errors
+
+# El lote es todo o nada: los eventos que la API rechazaría se apartan para
+# que no impidan añadir el resto
+def split_events(events):
+    valid, rejected = [], []
+    for position, event in enumerate(events):
+        errors = event_errors(event)
+        if errors:
+            print(f"Evento {position} ({event.get('summary')}) descartado: {'; '.join(errors)}")
+            rejected.append(event)
+        else:
+            valid.append(event)
+    return valid, rejected
+
+# Enviar todos los eventos en una sola petición. Devuelve si se han añadido
+def send_events(events, token):
+    for event in events:
+        event.pop('id', None)
+
+    payload = json.dumps({'create': events})
+    print(f"Enviando {len(events)} eventos")
     response = subprocess.run(
         [
-            'curl', '-X', 'POST', events_endpoint,
+            'curl', '-X', 'POST', bulk_endpoint,
             '-H', 'accept: application/json',
             '-H', f'Authorization: Bearer {token}',
             '-H', 'Content-Type: application/json',
-            '-d', json.dumps(event),
+            # El lote puede ser grande: se pasa por la entrada estándar
+            '--data-binary', '@-',
+            # Código HTTP en la última línea, para comprobar el resultado
+            '--write-out', '\n%{http_code}',
             '-v'  # Agregar la opción -v para salida detallada
         ],
+        input=payload,
         capture_output=True,
         text=True
     )
     if response.returncode != 0:
-        print(f"Error enviando el evento: {response.stderr}")
-    else:
-        print(f"Respuesta del servidor: {response.stdout}")
+        print(f"Error enviando los eventos: {response.stderr}")
+        return False
+    body, _, status_code = response.stdout.rpartition('\n')
+    print(f"Respuesta del servidor ({status_code}): {body}")
+    if status_code != '200':
+        print("El servidor ha rechazado el lote: no se ha añadido ningún evento.")
+        return False
+    return True
 
-# Leer el archivo JSON y enviar eventos
+# Leer el archivo JSON y enviar eventos. Devuelve el código de salida: 1 si
+# algún evento no se ha añadido
 def main(input_file_path):
     if not os.path.exists(input_file_path):
         print(f"El archivo {input_file_path} no existe.")
-        return
+        return 1
 
     with open(input_file_path, 'r') as file:
         try:
@@ -74,19 +129,28 @@ def main(input_file_path):
             print(f"Archivo JSON cargado correctamente: {events}")
         except json.JSONDecodeError as e:
             print(f"Error decodificando JSON: {e}")
-            return
+            return 1
 
-    token = get_access_token()
-    if not token:
-        print("No se pudo obtener el token de acceso.")
-        return
+    events, rejected = split_events(events)
+    if rejected:
+        rejected_file_path = os.path.splitext(input_file_path)[0] + '_rejected.json'
+        with open(rejected_file_path, 'w') as file:
+            json.dump(rejected, file, ensure_ascii=False, indent=4)
+        print(f"{len(rejected)} eventos descartados, guardados en {rejected_file_path}")
 
-    for event in events:
-        send_event(event, token)
+    if events:
+        token = get_access_token()
+        if not token:
+            print("No se pudo obtener el token de acceso.")
+            return 1
+        if not send_events(events, token):
+            return 1
+
+    return 1 if rejected else 0
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Enviar eventos a un servidor.')
     parser.add_argument('input_file_path', type=str, help='Ruta del archivo JSON con los eventos a enviar')
     args = parser.parse_args()
     
-    main(args.input_file_path)
\ No newline at end of file
+    sys.exit(main(args.input_file_path))
\ No newline at end of file
@@ -1,14 +1,40 @@
 import json
 import os
+import sys
 from collections import defaultdict
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+# Solo event_archive, que usa la biblioteca estándar: el script no necesita
+# las dependencias de la API
+from app.utils.event_archive import EventArchive  # noqa: E402
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Construir la ruta al archivo events.json en la carpeta superior
 file_path = os.path.join(os.path.dirname(__file__), '../comiccalendar-events', 'events.json')
 
-# Leer el archivo events.json
-with open(file_path, 'r', encoding='utf-8') as f:
-    events = json.load(f)
+# Instantánea binaria que genera la API junto a events.json
+archive_path = os.path.join(os.path.dirname(__file__), '../comiccalendar-events', 'events.bin')
+fields = ('community', 'province', 'type', 'start_date')
+
+def load_events():
+    # Con la instantánea solo se leen los campos necesarios; si no existe o
+    # no corresponde a events.json y su diario actuales, se lee el JSON
+    try:
+        with EventArchive(archive_path) as archive:
+            if archive.built_from([file_path, file_path + '.journal']):
+                return [dict(zip(fields, values)) for values in archive.columns(*fields)]
+    except (OSError, ValueError):
+        pass
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+events = load_events()
 
 # Inicializar diccionarios para almacenar los datos
 eventos_totales_por_comunidad_y_año = defaultdict(lambda: defaultdict(int))
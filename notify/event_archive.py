@@ -0,0 +1,285 @@
+"""Instantánea binaria de los eventos, pensada para leerse con mmap.
+
+Formato (enteros little-endian):
+
+    cabecera   HEADER: firma, versión del formato, nº de eventos, nº de
+               textos, longitud de los metadatos y posición de cada sección
+    metadatos  JSON: nombres de los campos, versión de los datos, huella de
+               los ficheros de origen...
+    filas      una por evento, de ancho fijo y en el orden de events.json:
+               el id (int64) y, por cada campo de texto, su número en la tabla
+    índice     (id int64, nº de fila uint32) por evento, ordenado por id
+    offsets    (nº de textos + 1) uint64: inicio de cada texto en la tabla
+    textos     tabla de textos UTF-8, sin repetidos
+
+Como las filas tienen ancho fijo, la fila i empieza en una posición
+conocida y un evento se localiza por id con una búsqueda binaria en el
+índice, sin leer el resto. Los textos repetidos (provincias, ciudades, fechas) se guardan una
+sola vez y al cargar todos los eventos comparten el mismo objeto str.
+
+Solo usa la biblioteca estándar para que puedan leerlo también los scripts
+que no cargan la aplicación.
+"""
+
+import json
+import mmap
+import os
+import struct
+from typing import (
+    Any,
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+MAGIC = b"CCEV"
+FORMAT_VERSION = 1
+
+# firma, versión, nº de eventos, nº de textos, longitud de los metadatos y
+# posición de filas, índice, offsets y textos
+HEADER = struct.Struct("<4sHxxIIIQQQQ")
+INDEX_ENTRY = struct.Struct("<qI")
+OFFSET = struct.Struct("<Q")
+
+
+def file_fingerprint(path: str) -> Optional[List[int]]:
+    """Inodo, tamaño y mtime_ns del fichero (None si no existe), como se
+    guardan en el metadato "fingerprint"."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+
+
+def row_struct(field_count: int) -> struct.Struct:
+    # El primer campo es el id; el resto, números de texto
+    return struct.Struct("<q" + "I" * (field_count - 1))
+
+
+def write_archive(
+    file: BinaryIO,
+    fields: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    meta: Optional[Dict[str, Any]] = None,
+):
+    """Escribe las filas (valores de fields en orden, con el id primero).
+
+    Conviene escribir en un temporal y renombrarlo: los lectores con el
+    fichero mapeado siguen viendo la versión anterior."""
+    strings: Dict[str, int] = {}
+    row_format = row_struct(len(fields))
+    packed = bytearray()
+    ids = []
+    for number, row in enumerate(rows):
+        refs = [strings.setdefault(value, len(strings)) for value in row[1:]]
+        packed += row_format.pack(row[0], *refs)
+        ids.append((row[0], number))
+    ids.sort()
+    index = b"".join(INDEX_ENTRY.pack(*entry) for entry in ids)
+
+    encoded = [value.encode() for value in strings]
+    offsets = bytearray()
+    position = 0
+    for value in encoded:
+        offsets += OFFSET.pack(position)
+        position += len(value)
+    offsets += OFFSET.pack(position)
+
+    meta_bytes = json.dumps(
+        dict(meta or {}, fields=list(fields)), separators=(",", ":")
+    ).encode()
+    rows_offset = HEADER.size + len(meta_bytes)
+    index_offset = rows_offset + len(packed)
+    offsets_offset = index_offset + len(index)
+    strings_offset = offsets_offset + len(offsets)
+    file.write(
+        HEADER.pack(
+            MAGIC,
+            FORMAT_VERSION,
+            len(ids),
+            len(encoded),
+            len(meta_bytes),
+            rows_offset,
+            index_offset,
+            offsets_offset,
+            strings_offset,
+        )
+    )
+    file.write(meta_bytes)
+    file.write(packed)
+    file.write(index)
+    file.write(offsets)
+    for value in encoded:
+        file.write(value)
+
+
+class EventArchive:
+    """Lector de una instantánea binaria.
+
+    Los eventos se leen bajo demanda desde el fichero mapeado, sin copiarlo:
+    abrirla no depende del número de eventos y solo se decodifican los
+    textos que se piden. Lanza ValueError si el fichero no es una
+    instantánea o es de otra versión del formato."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self.buffer) < HEADER.size:
+                raise ValueError(f"{path} is not an event archive")
+            (
+                magic,
+                version,
+                self.count,
+                self.string_count,
+                meta_length,
+                self.rows_offset,
+                self.index_offset,
+                self.offsets_offset,
+                self.strings_offset,
+            ) = HEADER.unpack_from(self.buffer)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not an event archive")
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported event archive version {version}")
+            self.meta: Dict[str, Any] = json.loads(
+                self.buffer[HEADER.size : HEADER.size + meta_length]
+            )
+        except BaseException:
+            self.buffer.close()
+            raise
+        self.view = memoryview(self.buffer)
+        self.fields: List[str] = self.meta["fields"]
+        self.row = row_struct(len(self.fields))
+
+    def __enter__(self) -> "EventArchive":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.view.release()
+        self.buffer.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def built_from(self, paths: Sequence[str]) -> bool:
+        """Si se generó a partir de esos ficheros tal como están ahora.
+
+        Compara la huella de los metadatos, no las fechas: un events.json
+        restaurado o copiado con su fecha original también cuenta como
+        cambio."""
+        return self.meta.get("fingerprint") == [file_fingerprint(p) for p in paths]
+
+    def string(self, number: int) -> str:
+        start, end = struct.unpack_from(
+            "<QQ", self.view, self.offsets_offset + number * OFFSET.size
+        )
+        base = self.strings_offset
+        return str(self.view[base + start : base + end], "utf-8")
+
+    def strings(self) -> List[str]:
+        """Toda la tabla de textos, para cargar todos los eventos de golpe."""
+        offsets = struct.unpack_from(
+            f"<{self.string_count + 1}Q", self.view, self.offsets_offset
+        )
+        data = self.view[self.strings_offset : self.strings_offset + offsets[-1]]
+        return [
+            str(data[offsets[i] : offsets[i + 1]], "utf-8")
+            for i in range(self.string_count)
+        ]
+
+    def refs(self, row: int) -> tuple:
+        """Fila sin decodificar: el id y los números de sus textos."""
+        return self.row.unpack_from(self.view, self.rows_offset + row * self.row.size)
+
+    def values(self, row: int) -> tuple:
+        event_id, *refs = self.refs(row)
+        return (event_id, *(self.string(ref) for ref in refs))
+
+    def field(self, row: int, name: str) -> Any:
+        """Un solo campo de la fila, sin decodificar el resto."""
+        refs = self.refs(row)
+        position = self.fields.index(name)
+        return refs[0] if position == 0 else self.string(refs[position])
+
+    def index_entry(self, position: int) -> Tuple[int, int]:
+        """Entrada position del índice: (id, fila)."""
+        return INDEX_ENTRY.unpack_from(
+            self.view, self.index_offset + position * INDEX_ENTRY.size
+        )
+
+    def bisect(self, event_id: int) -> int:
+        """Posición en el índice del primer evento con id >= event_id."""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.index_entry(middle)[0] < event_id:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def find(self, event_id: int) -> Optional[int]:
+        """Fila del evento, o None si no está."""
+        position = self.bisect(event_id)
+        if position < self.count:
+            entry_id, row = self.index_entry(position)
+            if entry_id == event_id:
+                return row
+        return None
+
+    def max_id(self) -> int:
+        return self.index_entry(self.count - 1)[0] if self.count else 0
+
+    def get(self, event_id: int) -> Optional[Dict[str, Any]]:
+        row = self.find(event_id)
+        if row is None:
+            return None
+        return dict(zip(self.fields, self.values(row)))
+
+    def since(self, event_id: int) -> Iterator[Dict[str, Any]]:
+        """Eventos con id mayor que event_id, en orden de id. Solo se leen
+        esas filas."""
+        for position in range(self.bisect(event_id + 1), self.count):
+            yield dict(zip(self.fields, self.values(self.index_entry(position)[1])))
+
+    def columns(self, *names: str) -> Iterator[tuple]:
+        """Solo los campos pedidos de cada evento, en el orden de escritura.
+        Cada texto se decodifica una vez aunque lo compartan varias filas."""
+        positions = [self.fields.index(name) for name in names]
+        decoded: Dict[int, str] = {}
+        for refs in self.row.iter_unpack(
+            self.view[self.rows_offset : self.index_offset]
+        ):
+            values = []
+            for position in positions:
+                if position == 0:
+                    values.append(refs[0])
+                    continue
+                ref = refs[position]
+                value = decoded.get(ref)
+                if value is None:
+                    value = decoded[ref] = self.string(ref)
+                values.append(value)
+            yield tuple(values)
+
+    def rows(self) -> Iterator[tuple]:
+        """Todas las filas decodificadas, en el orden en que se escribieron."""
+        strings = self.strings()
+        for event_id, *refs in self.row.iter_unpack(
+            self.view[self.rows_offset : self.index_offset]
+        ):
+            yield (event_id, *(strings[ref] for ref in refs))
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for values in self.rows():
+            yield dict(zip(self.fields, values))
@@ -6,6 +6,12 @@ from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, BotCommand
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes
 from dotenv import load_dotenv
+from event_archive import EventArchive
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # INITIAL SETUP
 
@@ -17,6 +23,10 @@ load_dotenv(dotenv_path)
 telegram_timer = os.getenv("TELEGRAM_TIMER_SECONDS")
 telegram_token = os.getenv("TELEGRAM_TOKEN")
 
+# Directorio de datos de la API: events.json y su instantánea binaria
+events_dir = os.getenv("EVENTS_DIR", ".")
+events_archive_path = os.path.join(events_dir, "events.bin")
+
 # Configurar el logging
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -68,19 +78,50 @@ def save_preferences(preferences):
         json.dump(data, file, indent=4)
 
 def load_events_from_file(file_path):
-    with open(file_path, 'r') as file:
-        events = json.load(file)
-    return events
+    # events.json puede tener miles de eventos: orjson si está instalado
+    with open(file_path, 'rb') as file:
+        data = file.read()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def open_events_archive(events_file_path):
+    # Si no existe, es de otra versión o no corresponde a events.json y su
+    # diario actuales (p. ej. con la API parada), se lee events.json
+    try:
+        archive = EventArchive(events_archive_path)
+    except (OSError, ValueError):
+        return None
+    if not archive.built_from([events_file_path, events_file_path + ".journal"]):
+        archive.close()
+        return None
+    return archive
+
+def load_new_events(events_file_path, last_processed_id):
+    """Eventos con id mayor que last_processed_id y total de eventos.
+
+    Con la instantánea binaria solo se leen los eventos nuevos."""
+    archive = open_events_archive(events_file_path)
+    if archive is not None:
+        with archive:
+            return list(archive.since(last_processed_id)), len(archive)
+    events = load_events_from_file(events_file_path)
+    return [event for event in events if event['id'] > last_processed_id], len(events)
 
 def get_last_processed_id(events_file_path, last_id_file_path):
     if os.path.exists(last_id_file_path):
         with open(last_id_file_path, 'r') as file:
             return int(file.read().strip())
     else:
+        archive = open_events_archive(events_file_path)
+        if archive is not None:
+            with archive:
+                max_id = archive.max_id()
+            save_last_processed_id(last_id_file_path, max_id)
+            return max_id
         # Leer el archivo de eventos para obtener el mayor ID
         try:
-            with open(events_file_path, 'r') as file:
-                events = json.load(file)
+            events = load_events_from_file(events_file_path)
             if events:
                 max_id = max(event['id'] for event in events)
                 save_last_processed_id(last_id_file_path, max_id)
@@ -246,7 +287,7 @@ async def button(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
 # Función para comprobar los eventos 
 async def check_events(context: ContextTypes.DEFAULT_TYPE) -> None:
-    events_file_path = "./events.json"
+    events_file_path = os.path.join(events_dir, "events.json")
     last_id_file_path = "../app2/last_processed_id.txt"
     
     # Leer el último ID procesado
@@ -256,13 +297,12 @@ async def check_events(context: ContextTypes.DEFAULT_TYPE) -> None:
     print("############################################")
 
     try:
-        with open(events_file_path, 'r') as file:
-            events = json.load(file)
-            print("############################################")
-            logger.info("Eventos cargados correctamente.")
-            print("############################################")
+        new_events, total_events = load_new_events(events_file_path, last_processed_id)
+        print("############################################")
+        logger.info("Eventos cargados correctamente.")
+        print("############################################")
     except FileNotFoundError:
-        events = []
+        new_events, total_events = [], 0
         print("############################################")
         logger.info("PWD: %s", os.getcwd())
         logger.error("No se encontró el archivo de eventos.")
@@ -274,10 +314,8 @@ async def check_events(context: ContextTypes.DEFAULT_TYPE) -> None:
     except FileNotFoundError:
         users = []
 
-    # Filtrar los eventos a partir del último ID procesado
-    new_events = [event for event in events if event['id'] > last_processed_id]
     print("############################################")
-    logger.info("Eventos totales: %s", len(events))
+    logger.info("Eventos totales: %s", total_events)
     logger.info("Nuevos eventos: %s", new_events)
     print("############################################")
 
@@ -1,6 +1,92 @@
 # tests/conftest.py
+import json
 import sys
 import os
 
 # Agregar la ruta del proyecto al PYTHONPATH
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
\ No newline at end of file
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from app.auth.auth import get_current_user
+from app.main import app
+from app.models.events import Event
+from app.utils import cache, file_operations, snapshot
+from app.utils.event_store import EventStore
+
+
+@pytest.fixture
+def make_event():
+    def _make_event(event_id, start_date, **kwargs):
+        data = {
+            "id": event_id,
+            "summary": f"Evento {event_id}",
+            "start_date": start_date,
+            "end_date": start_date,
+            "create_date": "2024-01-01 00:00:00",
+            "update_date": "2024-01-01 00:00:00",
+            "province": "Madrid",
+            "community": "Comunidad de Madrid",
+            "city": "Madrid",
+            "type": "Evento",
+            "address": "",
+            "description": "",
+        }
+        data.update(kwargs)
+        return Event(**data)
+
+    return _make_event
+
+
+@pytest.fixture
+def events():
+    """Eventos del almacén de store; cada módulo define los suyos."""
+    return []
+
+
+@pytest.fixture(autouse=True)
+def data_dir(monkeypatch, tmp_path):
+    """Todos los ficheros de datos (events.json, diario, events.bin,
+    cerrojos, instantáneas...) en tmp_path y la caché vacía, para que
+    ninguna prueba lea ni escriba en el directorio del proyecto."""
+    monkeypatch.setattr(
+        file_operations, "events_file_path", str(tmp_path / "events.json")
+    )
+    monkeypatch.setattr(snapshot, "snapshot_dir", str(tmp_path / "snapshot"))
+    monkeypatch.setattr(snapshot, "current", None)
+    monkeypatch.setattr(snapshot, "written", set())
+    monkeypatch.setattr(cache, "cached_store", None)
+    monkeypatch.setattr(cache, "cached_fingerprint", None)
+    monkeypatch.setattr(cache, "cached_change_count", None)
+    return tmp_path
+
+
+@pytest.fixture
+def store(monkeypatch, data_dir, events):
+    """Almacén en caché con events, sobre un events.json vacío."""
+    store = EventStore(events)
+    (data_dir / "events.json").write_text("[]")
+    monkeypatch.setattr(cache, "cached_store", store)
+    monkeypatch.setattr(cache, "cached_fingerprint", cache.events_fingerprint())
+    return store
+
+
+@pytest.fixture
+def events_file(monkeypatch, data_dir, make_event):
+    """events.json sin caché cargada. Devuelve una función que lo reescribe
+    con los ids indicados."""
+    path = data_dir / "events.json"
+    monkeypatch.setattr(cache, "CHECK_INTERVAL", 0)
+
+    def write(*event_ids):
+        events = [make_event(event_id, "2024-01-01 10:00:00") for event_id in event_ids]
+        path.write_text(json.dumps([event.dict() for event in events]))
+
+    return write
+
+
+@pytest.fixture
+def authorized():
+    """Rutas protegidas sin token."""
+    app.dependency_overrides[get_current_user] = lambda: None
+    yield
+    app.dependency_overrides.pop(get_current_user, None)
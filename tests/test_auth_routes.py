@@ -0,0 +1,165 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils import cache, file_operations
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def events(make_event):
+    return [
+        make_event(1, "2024-05-03 10:00:00", summary="Salón del Cómic"),
+        make_event(2, "2024-06-12 18:00:00", summary="Firma de Paco"),
+    ]
+
+
+@pytest.fixture
+def store(store, authorized):
+    return store
+
+
+@pytest.fixture
+def saved(monkeypatch):
+    saved = []
+
+    async def fake_save_event_changes(upserted=(), deleted=(), tombstones=()):
+        saved.append(([event.id for event in upserted], list(deleted)))
+
+    monkeypatch.setattr(file_operations, "save_event_changes", fake_save_event_changes)
+    monkeypatch.setattr(cache, "schedule_compaction", lambda: None)
+    return saved
+
+
+def new_event_data(**kwargs):
+    data = {
+        "summary": "Expocómic",
+        "start_date": "2024-12-05 10:00:00",
+        "end_date": "2024-12-08 21:00:00",
+        "province": "Madrid",
+        "community": "Comunidad de Madrid",
+        "city": "Madrid",
+        "type": "Evento",
+        "address": "IFEMA",
+        "description": "",
+    }
+    data.update(kwargs)
+    return data
+
+
+def test_create_event_updates_store(store, saved):
+    response = client.post("/v1/events/", json=new_event_data())
+    assert response.status_code == 201
+    assert response.json()["id"] == 3
+    assert saved == [([3], [])]
+    assert store.filter_summary("expocomic") == {3}
+
+
+def test_create_event_invalid_date(store, saved):
+    response = client.post("/v1/events/", json=new_event_data(start_date="mañana"))
+    assert response.status_code == 400
+    assert saved == []
+    assert len(store) == 2
+
+
+def test_update_event_reindexes(store, saved):
+    response = client.put("/v1/events/2/", json={"summary": "Firma de Roca"})
+    assert response.status_code == 200
+    assert store.filter_summary("paco") == set()
+    assert store.filter_summary("roca") == {2}
+    assert store.get(2).create_date == "2024-01-01 00:00:00"
+    assert saved == [([2], [])]
+
+
+def test_delete_event_rolls_back_on_error(store, monkeypatch):
+    async def failing_save_event_changes(upserted=(), deleted=(), tombstones=()):
+        raise OSError("disco lleno")
+
+    monkeypatch.setattr(
+        file_operations, "save_event_changes", failing_save_event_changes
+    )
+    response = client.delete("/v1/events/1")
+    assert response.status_code == 500
+    assert store.get(1) is not None
+    assert store.filter_summary("salon") == {1}
+
+
+def test_bulk_events_single_write(store, saved):
+    version = store.version
+    response = client.post(
+        "/v1/events/bulk",
+        json={
+            "create": [new_event_data(), new_event_data(summary="Firma de Roca")],
+            "update": [{"id": 2, "city": "Getafe"}],
+            "delete": [1],
+        },
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [event["id"] for event in data["created"]] == [3, 4]
+    assert data["updated"][0]["city"] == "Getafe"
+    assert data["deleted"] == [1]
+    assert saved == [([3, 4, 2], [1])]
+    assert store.version > version
+    assert store.filter_summary("roca") == {4}
+    assert store.get(1) is None
+    assert 1 in store.tombstones
+    # Todo el lote comparte una única versión
+    assert {version for version, _ in store.change_log} == {store.version}
+
+
+def test_bulk_events_rejects_whole_batch(store, saved):
+    response = client.post(
+        "/v1/events/bulk",
+        json={
+            "create": [new_event_data(), new_event_data(community="Cataluña")],
+            "delete": [1],
+        },
+    )
+    assert response.status_code == 400
+    assert saved == []
+    assert len(store) == 2
+
+    response = client.post("/v1/events/bulk", json={"delete": [1, 7]})
+    assert response.status_code == 404
+    assert store.get(1) is not None
+
+
+def test_bulk_events_reserves_ids_only_for_valid_creates(store, saved, tmp_path):
+    ids_file = tmp_path / "events.json.ids"
+    rejected = [
+        {"create": [new_event_data(), new_event_data(community="Cataluña")]},
+        {"create": [new_event_data(start_date="mañana")]},
+    ]
+    for batch in rejected:
+        assert client.post("/v1/events/bulk", json=batch).status_code == 400
+    # Un lote sin altas tampoco reserva ids
+    response = client.post("/v1/events/bulk", json={"update": [{"id": 2}]})
+    assert response.status_code == 200
+    assert not ids_file.exists()
+
+    response = client.post("/v1/events/bulk", json={"create": [new_event_data()]})
+    assert [event["id"] for event in response.json()["created"]] == [3]
+    assert ids_file.read_text() == "3"
+
+
+def test_bulk_events_rolls_back_on_error(store, monkeypatch):
+    async def failing_save_event_changes(upserted=(), deleted=(), tombstones=()):
+        raise OSError("disco lleno")
+
+    monkeypatch.setattr(
+        file_operations, "save_event_changes", failing_save_event_changes
+    )
+    response = client.post(
+        "/v1/events/bulk",
+        json={
+            "create": [new_event_data()],
+            "update": [{"id": 2, "summary": "Firma de Roca"}],
+            "delete": [1],
+        },
+    )
+    assert response.status_code == 500
+    assert len(store) == 2
+    assert store.filter_summary("salon") == {1}
+    assert store.filter_summary("paco") == {2}
+    assert store.filter_summary("expocomic") == set()
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import os
+import pytest
+from app.utils import cache, file_operations
+from app.utils.event_archive import EventArchive
+
+
+def test_cache_reloads_when_file_changes(events_file):
+    async def scenario():
+        events_file(1, 2)
+        store = await cache.get_event_store()
+        assert len(store) == 2
+        assert await cache.get_event_store() is store
+
+        events_file(1, 2, 3)
+        # Mientras se recarga se sigue sirviendo la versión anterior
+        assert await cache.get_event_store() is store
+        await cache.reload_task
+        reloaded = await cache.get_event_store()
+        assert reloaded is not store
+        assert reloaded.get(3) is not None
+
+    asyncio.run(scenario())
+
+
+def test_cache_reload_is_single_flight(events_file, monkeypatch):
+    events_file(1, 2)
+    calls = []
+    read_events_file = file_operations.read_events_file
+
+    def counting_read_events_file():
+        calls.append(1)
+        return read_events_file()
+
+    monkeypatch.setattr(file_operations, "read_events_file", counting_read_events_file)
+
+    async def scenario():
+        stores = await asyncio.gather(*(cache.get_event_store() for _ in range(10)))
+        assert all(store is stores[0] for store in stores)
+
+    asyncio.run(scenario())
+    assert len(calls) == 1
+
+
+def test_cache_discards_reload_overlapping_a_write(events_file, make_event):
+    async def scenario():
+        events_file(1)
+        store = await cache.get_event_store()
+        events_file(1, 5)
+        await cache.get_event_store()
+        # Escritura mientras la recarga está en curso
+        store.upsert(make_event(2, "2024-02-01 10:00:00"))
+        await cache.persist_event_changes(upserted=[store.get(2)])
+        await cache.reload_task
+        assert cache.cached_store is store
+
+    asyncio.run(scenario())
+
+
+def test_cache_keeps_own_writes(events_file, make_event):
+    async def scenario():
+        events_file(1)
+        async with cache.write_transaction() as store:
+            store.upsert(make_event(2, "2024-02-01 10:00:00"))
+            await cache.persist_event_changes(upserted=[store.get(2)])
+        assert await cache.get_event_store() is store
+
+    asyncio.run(scenario())
+
+
+def test_cache_compacts_journal(events_file, make_event, monkeypatch):
+    monkeypatch.setattr(cache, "COMPACTION_DELAY", 0)
+
+    async def scenario():
+        events_file(1)
+        store = await cache.get_event_store()
+        store.upsert(make_event(2, "2024-02-01 10:00:00"))
+        await cache.persist_event_changes(upserted=[store.get(2)])
+        await cache.compaction_task
+        assert await cache.get_event_store() is store
+
+    asyncio.run(scenario())
+    path = file_operations.events_file_path
+    assert [event["id"] for event in json.load(open(path))] == [1, 2]
+    assert open(file_operations.journal_file_path()).read() == ""
+    # La instantánea binaria se regenera con cada events.json
+    with EventArchive(file_operations.archive_file_path()) as archive:
+        assert [row[0] for row in archive.rows()] == [1, 2]
+        assert archive.meta["version"] == cache.cached_store.version
+
+
+def test_store_captures_last_updated_with_version(events_file, make_event, tmp_path):
+    async def scenario():
+        events_file(1, 2)
+        store = await cache.get_event_store()
+        mtime = (tmp_path / "events.json").stat().st_mtime_ns / 1e9
+        assert store.last_modified == mtime
+        assert store.last_updated.timestamp() == pytest.approx(mtime)
+
+        version, last_updated = store.version, store.last_updated
+        store.upsert(make_event(3, "2024-01-01 10:00:00"))
+        assert store.version > version
+        assert store.last_updated >= last_updated
+
+    asyncio.run(scenario())
+
+
+def test_workers_share_binary_archive(events_file, monkeypatch):
+    calls = []
+    read_stored_events = file_operations.read_stored_events
+
+    def counting_read_stored_events():
+        calls.append(1)
+        return read_stored_events()
+
+    monkeypatch.setattr(
+        file_operations, "read_stored_events", counting_read_stored_events
+    )
+    events_file(1, 2)
+    _, first = cache.build_store()
+    assert os.path.exists(file_operations.archive_file_path())
+    # Los lectores sin la API (notify, gráficas) reconocen que está al día
+    with EventArchive(file_operations.archive_file_path()) as archive:
+        assert archive.built_from(file_operations.storage_paths())
+
+    # Otro worker: carga la instantánea sin leer events.json
+    _, second = cache.build_store()
+    assert len(calls) == 1
+    assert second.version == first.version
+    assert [event.model_dump() for event in second.events] == [
+        event.model_dump() for event in first.events
+    ]
+    assert second.filter_summary("evento") == {1, 2}
+
+    # Si cambian los datos, la instantánea deja de valer
+    events_file(1, 2, 3)
+    _, third = cache.build_store()
+    assert len(calls) == 2
+    assert len(third) == 3
+    assert third.version > first.version
@@ -0,0 +1,94 @@
+import json
+from datetime import datetime
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils import cache
+from app.utils.event_record import madrid_tz
+from app.utils.event_store import EventStore, Tombstone
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def events(make_event):
+    return [
+        make_event(
+            event_id,
+            "2024-05-03 10:00:00",
+            update_date=f"2024-03-{event_id:02d} 10:00:00",
+        )
+        for event_id in range(1, 6)
+    ]
+
+
+@pytest.fixture
+def store(store, monkeypatch, authorized):
+    monkeypatch.setattr(cache, "schedule_compaction", lambda: None)
+    return store
+
+
+def changes(**params):
+    response = client.get("/v1/events/changes", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_changes_since_date(store):
+    data = changes(since="2024-03-04")
+    assert [event["id"] for event in data["upserted"]] == [4, 5]
+    assert data["deleted"] == []
+    assert data["version"] == store.version
+
+
+def test_changes_since_version_include_deletes(store, tmp_path):
+    version = changes(since="2030-01-01")["version"]
+    assert client.delete("/v1/events/2").status_code == 204
+    response = client.put("/v1/events/3/", json={"summary": "Nuevo"})
+    assert response.status_code == 200
+
+    data = changes(since_version=version)
+    assert [event["id"] for event in data["upserted"]] == [3]
+    assert data["deleted"] == [2]
+    assert changes(since_version=data["version"]) == {
+        **data,
+        "upserted": [],
+        "deleted": [],
+    }
+
+    # El borrado queda registrado en disco y sobrevive a una recarga
+    records = [
+        json.loads(line)
+        for line in (tmp_path / "events.json.deleted").read_text().splitlines()
+    ]
+    assert [record["id"] for record in records] == [2]
+    _, reloaded = cache.build_store()
+    assert list(reloaded.tombstones) == [2]
+
+
+def test_changes_version_before_load_uses_dates(store):
+    # Una versión antigua se traduce a fecha de modificación
+    data = changes(since_version=0)
+    assert len(data["upserted"]) == 5
+
+
+def test_changes_version_before_load_keeps_same_second(store, monkeypatch, make_event):
+    event = make_event(1, "2024-05-03 10:00:00", update_date="2024-05-03 12:00:05")
+    tombstone = Tombstone(2, "2024-05-03 12:00:05", 0)
+    monkeypatch.setattr(
+        cache, "cached_store", EventStore([event], tombstones=[tombstone])
+    )
+    # Versión de un cliente que sincronizó a las 12:00:05.300, antes de que
+    # se recargaran los datos con ese cambio
+    written = madrid_tz.localize(datetime(2024, 5, 3, 12, 0, 5, 300000))
+    data = changes(since_version=int(written.timestamp() * 10**9))
+    assert [event["id"] for event in data["upserted"]] == [1]
+    assert data["deleted"] == [2]
+
+
+def test_changes_requires_one_parameter(store):
+    assert client.get("/v1/events/changes").status_code == 400
+    response = client.get(
+        "/v1/events/changes", params={"since": "2024-01-01", "since_version": 1}
+    )
+    assert response.status_code == 400
@@ -0,0 +1,107 @@
+import io
+import os
+import struct
+import pytest
+from app.utils import event_archive
+from app.utils.event_archive import EventArchive, write_archive
+
+FIELDS = ["id", "summary", "province"]
+
+
+@pytest.fixture
+def archive_path(tmp_path):
+    path = tmp_path / "events.bin"
+    rows = [(7, "Salón del Cómic", "Barcelona"), (2, "Firma", "Madrid")]
+    rows += [(event_id, f"Evento {event_id}", "Madrid") for event_id in range(10, 20)]
+    with open(path, "wb") as f:
+        write_archive(f, FIELDS, rows, {"version": 42})
+    return path
+
+
+def test_archive_round_trip(archive_path):
+    with EventArchive(str(archive_path)) as archive:
+        assert len(archive) == 12
+        assert archive.meta["version"] == 42
+        rows = list(archive.rows())
+        # Se conserva el orden de escritura
+        assert [row[0] for row in rows[:3]] == [7, 2, 10]
+        assert rows[0] == (7, "Salón del Cómic", "Barcelona")
+        # Los textos repetidos se guardan una vez y se comparten al cargar
+        assert rows[1][2] is rows[2][2]
+        assert archive.string_count == 14
+
+
+def test_archive_lookup_by_id(archive_path):
+    with EventArchive(str(archive_path)) as archive:
+        assert archive.get(7) == {
+            "id": 7,
+            "summary": "Salón del Cómic",
+            "province": "Barcelona",
+        }
+        assert archive.get(15)["summary"] == "Evento 15"
+        assert archive.get(3) is None
+        assert archive.get(100) is None
+
+
+def test_archive_rejects_other_formats(tmp_path, archive_path):
+    data = bytearray(archive_path.read_bytes())
+    struct.pack_into("<H", data, 4, event_archive.FORMAT_VERSION + 1)
+    newer = tmp_path / "newer.bin"
+    newer.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        EventArchive(str(newer))
+
+    other = tmp_path / "events.json"
+    other.write_text("[]" * 40)
+    with pytest.raises(ValueError):
+        EventArchive(str(other))
+
+
+def test_empty_archive(tmp_path):
+    buffer = io.BytesIO()
+    write_archive(buffer, FIELDS, [])
+    path = tmp_path / "empty.bin"
+    path.write_bytes(buffer.getvalue())
+    with EventArchive(str(path)) as archive:
+        assert len(archive) == 0
+        assert list(archive) == []
+        assert archive.get(1) is None
+
+
+def test_archive_partial_reads(archive_path):
+    with EventArchive(str(archive_path)) as archive:
+        assert archive.max_id() == 19
+        assert [event["id"] for event in archive.since(12)] == list(range(13, 20))
+        assert [event["id"] for event in archive.since(0)][:3] == [2, 7, 10]
+        assert list(archive.since(19)) == []
+        assert archive.field(archive.find(7), "province") == "Barcelona"
+        columns = list(archive.columns("province", "id"))
+        assert columns[:2] == [("Barcelona", 7), ("Madrid", 2)]
+
+
+def test_archive_built_from_ignores_mtime(tmp_path):
+    source = tmp_path / "events.json"
+    source.write_text("[1]")
+    path = str(tmp_path / "events.bin")
+    sources = [str(source), str(source) + ".journal"]
+    meta = {"fingerprint": [event_archive.file_fingerprint(p) for p in sources]}
+    with open(path, "wb") as f:
+        write_archive(f, FIELDS, [], meta)
+    with EventArchive(path) as archive:
+        assert archive.built_from(sources)
+
+    # Restaurado con una fecha anterior (cp -p, rsync -a): ya no vale
+    stat = source.stat()
+    source.write_text("[1, 2]")
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10**9))
+    with EventArchive(path) as archive:
+        assert not archive.built_from(sources)
+
+
+def test_notify_reader_matches_app_reader():
+    # notify se construye con su propio contexto de Docker y lleva una copia
+    root = os.path.join(os.path.dirname(__file__), "..")
+    with open(os.path.join(root, "app", "utils", "event_archive.py")) as f:
+        original = f.read()
+    with open(os.path.join(root, "notify", "event_archive.py")) as f:
+        assert f.read() == original
@@ -3,6 +3,7 @@ import os
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
+from app.utils import file_operations
 
 client = TestClient(app)
 
@@ -15,6 +16,13 @@ def events(events_file_path):
     with open(events_file_path, 'r') as file:
         return json.load(file)
 
+@pytest.fixture(autouse=True)
+def events_file(events_file, events):
+    # Copia de tests/events.json en tmp_path, como datos de la API
+    with open(file_operations.events_file_path, 'w') as file:
+        json.dump(events, file)
+    return events_file
+
 @pytest.fixture(autouse=True)
 def mock_read_events(monkeypatch, events):
     async def mock_read_events(limit: int = 20, offset: int = 0):
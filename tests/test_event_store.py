@@ -0,0 +1,146 @@
+import gc
+import json
+import tracemalloc
+from datetime import date, datetime, timezone
+from app.models.events import Event
+from app.utils.event_archive import EventArchive, write_archive
+from app.utils.event_record import FIELDS, EventRecord, load_archive, madrid_tz
+from app.utils.event_store import EventStore
+from app.utils.search_index import TrigramIndex
+
+
+def test_store_get_by_id(make_event):
+    store = EventStore([make_event(1, "2024-01-01 10:00:00")])
+    assert store.get(1).id == 1
+    assert store.get(2) is None
+
+
+def test_store_sorted_views(make_event):
+    events = [
+        make_event(1, "2024-03-01 10:00:00"),
+        make_event(2, "2024-01-01 10:00:00"),
+        make_event(3, "2024-02-01 10:00:00"),
+    ]
+    store = EventStore(events)
+    assert [event.id for event in store.by_id_desc] == [3, 2, 1]
+    assert [event.id for event in store.by_start_date] == [1, 3, 2]
+    assert [event.id for event in store.page_by_id(1, 5)] == [2, 1]
+
+
+def test_store_dates_overlapping(make_event):
+    events = [
+        make_event(1, "2024-03-01 10:00:00", end_date="2024-03-03 20:00:00"),
+        make_event(2, "2024-01-01 10:00:00", end_date="2024-12-31 20:00:00"),
+        make_event(3, "2024-05-01 10:00:00"),
+    ]
+    store = EventStore(events)
+    assert str(store.dates.min_date) == "2024-01-01"
+    assert str(store.dates.max_date) == "2024-12-31"
+    overlapping = store.dates.overlapping
+    assert overlapping(date(2024, 3, 3), date(2024, 4, 1)) == {1, 2}
+    assert overlapping(date(2024, 5, 1), date(2024, 5, 1)) == {2, 3}
+    assert overlapping(date(2025, 1, 1), date(2025, 2, 1)) == set()
+
+
+def test_trigram_index_substring_search():
+    index = TrigramIndex()
+    index.add(1, "Salón del Cómic de Barcelona")
+    index.add(2, "Firma en Ávila")
+    index.add(3, "Jornadas del comic")
+    assert index.search("COMIC") == {1, 3}
+    assert index.search("comic", {2, 3}) == {3}
+    assert index.search("av") == {2}
+    assert index.search("cómic barcelona") == set()
+
+
+def test_store_timestamp_indexes(make_event):
+    store = EventStore(
+        [
+            make_event(1, "2024-05-03 10:00:00", create_date="2024-01-02 10:00:00"),
+            make_event(2, "2024-05-03 10:00:00", create_date="2024-01-01 10:00:00"),
+            make_event(3, "2024-05-03 10:00:00", create_date="no es una fecha"),
+        ]
+    )
+    assert store.created.since(madrid_tz.localize(datetime(2024, 1, 1))) == [2, 1]
+    # Las fechas de los eventos están en hora de Madrid (UTC+1 en enero)
+    assert store.created.since(datetime(2024, 1, 1, 9, 30, tzinfo=timezone.utc)) == [1]
+    store.remove(1, deleted_at="2024-02-01 00:00:00")
+    assert store.created.since(madrid_tz.localize(datetime(2024, 1, 1))) == [2]
+    assert list(store.tombstones) == [1]
+    store.upsert(make_event(1, "2024-05-03 10:00:00"))
+    assert store.tombstones == {}
+
+
+def test_store_sorts_by_parsed_start_date(make_event):
+    # 10:00 en Madrid (08:00 UTC) es anterior a 09:00 UTC aunque en texto no
+    store = EventStore(
+        [
+            make_event(1, "2024-05-03 09:00:00+00:00"),
+            make_event(2, "2024-05-03 10:00:00"),
+        ]
+    )
+    assert [event.id for event in store.by_start_date] == [1, 2]
+
+
+def test_event_record_memory(make_event, tmp_path):
+    """Benchmark: memoria de la caché con registros compactos frente a Event
+    y con los textos largos leídos bajo demanda de la instantánea."""
+    provinces = ["Madrid", "Barcelona", "Valencia", "Sevilla", "Málaga"]
+    raw = json.dumps(
+        [
+            make_event(
+                event_id,
+                f"2024-{event_id % 12 + 1:02d}-{event_id % 28 + 1:02d} 10:00:00",
+                province=provinces[event_id % 5],
+                city=provinces[event_id % 5],
+                description="Descripción del evento " * 10,
+            ).model_dump()
+            for event_id in range(5000)
+        ]
+    )
+
+    def retained_memory(build):
+        gc.collect()
+        tracemalloc.start()
+        objects = build()
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del objects
+        return size
+
+    models = retained_memory(lambda: [Event(**data) for data in json.loads(raw)])
+    records = retained_memory(
+        lambda: [EventRecord(Event(**data)) for data in json.loads(raw)]
+    )
+    path = tmp_path / "events.bin"
+    with open(path, "wb") as f:
+        rows = [tuple(data.values()) for data in json.loads(raw)]
+        write_archive(f, FIELDS, rows)
+    archive = EventArchive(str(path))
+    lazy = retained_memory(lambda: load_archive(archive))
+    print(
+        f"\n5000 events: Event {models / 5000:.0f} B/event, "
+        f"EventRecord {records / 5000:.0f} B/event, "
+        f"lazy EventRecord {lazy / 5000:.0f} B/event"
+    )
+    assert records < models * 0.6
+    assert lazy < records * 0.7
+
+
+def test_lazy_record_reads_heavy_fields_on_demand(make_event, tmp_path):
+    event = make_event(
+        3, "2024-05-03 10:00:00", address="IFEMA", description="Salón " * 100
+    )
+    path = tmp_path / "events.bin"
+    with open(path, "wb") as f:
+        write_archive(f, FIELDS, [EventRecord(event).values()])
+    (record,) = load_archive(EventArchive(str(path)))
+    # Solo se guarda la fila; los textos se leen al pedirlos
+    assert record._heavy == 0
+    assert record.description == event.description
+    assert record.to_event() == event
+
+    store = EventStore(records=[record])
+    assert store.filter_summary("evento") == {3}
+    assert store.get(3).address == "IFEMA"
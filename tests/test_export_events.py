@@ -0,0 +1,62 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.routes.v1 import event_routes
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def events(make_event):
+    return [
+        make_event(
+            event_id,
+            "2024-05-03 10:00:00",
+            create_date=f"2024-01-{event_id:02d} 10:00:00",
+            update_date=f"2024-03-{event_id:02d} 10:00:00",
+        )
+        for event_id in range(1, 8)
+    ]
+
+
+@pytest.fixture
+def store(store, monkeypatch):
+    # Bloques pequeños para probar varios
+    monkeypatch.setattr(event_routes, "EXPORT_CHUNK_SIZE", 3)
+    return store
+
+
+def test_export_ndjson(store):
+    response = client.get("/v1/events/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = response.text.splitlines()
+    assert [json.loads(line)["id"] for line in lines] == list(range(1, 8))
+
+
+def test_export_json_array_with_filters(store):
+    response = client.get(
+        "/v1/events/export",
+        params={"format": "json", "updated_since": "2024-03-03"},
+    )
+    assert [event["id"] for event in response.json()] == [3, 4, 5, 6, 7]
+    response = client.get(
+        "/v1/events/export",
+        params={
+            "format": "json",
+            "updated_since": "2024-03-03",
+            "created_since": "2024-01-06 00:00:00",
+        },
+    )
+    assert [event["id"] for event in response.json()] == [6, 7]
+    response = client.get(
+        "/v1/events/export", params={"format": "json", "created_since": "2025-01-01"}
+    )
+    assert response.json() == []
+
+
+def test_export_rejects_bad_parameters(store):
+    assert client.get("/v1/events/export", params={"format": "xml"}).status_code == 422
+    response = client.get("/v1/events/export", params={"updated_since": "ayer"})
+    assert response.status_code == 400
@@ -0,0 +1,103 @@
+import asyncio
+import json
+import time
+import pytest
+from app.utils import file_operations
+
+
+@pytest.fixture
+def events_path(monkeypatch, tmp_path):
+    path = tmp_path / "events.json"
+    monkeypatch.setattr(file_operations, "events_file_path", str(path))
+    return path
+
+
+def test_save_and_load_events(events_path, make_event):
+    events = [make_event(1, "2024-01-01 10:00:00", summary="Cómic")]
+    asyncio.run(file_operations.save_events(events))
+    assert json.loads(events_path.read_text())[0]["summary"] == "Cómic"
+    loaded = file_operations.read_stored_events()
+    assert loaded == events
+
+
+def test_stale_save_does_not_overwrite_newer(events_path, make_event, monkeypatch):
+    monkeypatch.setattr(file_operations, "last_written_sequence", 0)
+    file_operations.write_events_file([make_event(2, "2024-01-01 10:00:00")], 10**9)
+    file_operations.write_events_file([make_event(1, "2024-01-01 10:00:00")], 1)
+    assert [event["id"] for event in json.loads(events_path.read_text())] == [2]
+
+
+def test_event_loop_latency_during_large_save(events_path, make_event):
+    """Benchmark: el event loop sigue respondiendo mientras se guarda."""
+    events = [
+        make_event(event_id, "2024-01-01 10:00:00", description="x" * 500)
+        for event_id in range(20000)
+    ]
+
+    async def measure_latencies(save_task):
+        latencies = []
+        while not save_task.done():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    async def scenario():
+        start = time.perf_counter()
+        save_task = asyncio.create_task(file_operations.save_events(events))
+        latencies = await measure_latencies(save_task)
+        await save_task
+        return time.perf_counter() - start, latencies
+
+    save_time, latencies = asyncio.run(scenario())
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    worst = latencies[-1]
+    print(
+        f"\nsave {len(events)} events: {save_time * 1000:.0f} ms, "
+        f"loop latency p50 {p50 * 1000:.1f} ms, max {worst * 1000:.1f} ms "
+        f"over {len(latencies)} ticks"
+    )
+    # Si el guardado bloqueara el loop habría un único tick tan largo como él
+    assert len(latencies) > 10
+    assert worst < save_time / 2
+
+
+def test_event_changes_are_journaled(events_path, make_event):
+    asyncio.run(file_operations.save_events([make_event(1, "2024-01-01 10:00:00")]))
+    snapshot = events_path.read_text()
+    asyncio.run(
+        file_operations.save_event_changes(
+            upserted=[make_event(2, "2024-02-01 10:00:00")], deleted=[1]
+        )
+    )
+    # events.json no se reescribe, los cambios se aplican al leer
+    assert events_path.read_text() == snapshot
+    assert [event.id for event in file_operations.read_events_file()] == [2]
+
+
+def test_save_events_trims_journal(events_path, make_event):
+    asyncio.run(
+        file_operations.save_event_changes(
+            upserted=[make_event(1, "2024-01-01 10:00:00")]
+        )
+    )
+    asyncio.run(file_operations.save_events([make_event(1, "2024-01-01 10:00:00")]))
+    journal = events_path.parent / "events.json.journal"
+    assert journal.read_text() == ""
+    assert sorted(path.name for path in events_path.parent.iterdir()) == [
+        "events.json",
+        "events.json.journal",
+    ]
+
+
+def test_journal_ignores_partial_records(events_path, make_event):
+    asyncio.run(file_operations.save_events([]))
+    journal = events_path.parent / "events.json.journal"
+    journal.write_text('{"seq": 1, "op": "upsert", "event": {"id"')
+    asyncio.run(
+        file_operations.save_event_changes(
+            upserted=[make_event(3, "2024-01-01 10:00:00")]
+        )
+    )
+    assert [event.id for event in file_operations.read_events_file()] == [3]
@@ -0,0 +1,106 @@
+import gzip
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.response_cache import ResponseCache, response_cache
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def events(make_event):
+    return [
+        make_event(event_id, "2024-05-03 10:00:00", description="x" * 200)
+        for event_id in range(1, 11)
+    ]
+
+
+def test_lru_eviction():
+    lru = ResponseCache(max_entries=2)
+    lru.get(1, "a")
+    lru.put(1, "a", b"a")
+    lru.put(1, "b", b"b")
+    assert lru.get(1, "a").body == b"a"
+    lru.put(1, "c", b"c")
+    assert lru.get(1, "b") is None
+    assert lru.get(1, "a") is not None
+    # Otra versión de los datos invalida todo
+    assert lru.get(2, "a") is None
+
+
+def test_events_served_from_cache(store, monkeypatch):
+    first = client.get("/v1/events/", params={"limit": 5})
+    assert first.status_code == 200
+    assert [event["id"] for event in first.json()["events"]] == [10, 9, 8, 7, 6]
+
+    def fail(*args):
+        raise AssertionError("no debería recalcularse")
+
+    monkeypatch.setattr(store, "page_by_id", fail)
+    second = client.get("/v1/events/", params={"limit": 5})
+    assert second.content == first.content
+
+
+def test_gzip_variant_is_precomputed(store):
+    response = client.get(
+        "/v1/events/search/",
+        params={"province": "madrid"},
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert response.headers["content-encoding"] == "gzip"
+    entry = next(iter(response_cache.entries.values()))
+    assert gzip.decompress(entry.gzipped) == entry.body
+    assert json.loads(entry.body)["total"] == 10
+
+
+def test_cache_invalidated_on_mutation(store, make_event):
+    assert client.get("/v1/events/").json()["total"] == 10
+    store.remove(1)
+    assert client.get("/v1/events/").json()["total"] == 9
+
+
+def test_if_none_match_returns_304_before_filtering(store, monkeypatch):
+    first = client.get("/v1/events/search/", params={"province": "madrid"})
+    etag = first.headers["etag"]
+    assert first.headers["last-modified"]
+
+    def fail(**filters):
+        raise AssertionError("no debería filtrarse")
+
+    monkeypatch.setattr(store, "filter_ids", fail)
+    second = client.get(
+        "/v1/events/search/",
+        params={"province": "madrid"},
+        headers={"If-None-Match": etag},
+    )
+    assert second.status_code == 304
+    assert second.headers["etag"] == etag
+    assert second.content == b""
+
+    # Otra consulta u otra versión de los datos tienen otro ETag
+    other = client.get("/v1/events/", headers={"If-None-Match": etag})
+    assert other.status_code == 200
+    store.remove(1)
+    assert client.get("/v1/events/", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_gzip_variant_etag_revalidates(store):
+    headers = {"Accept-Encoding": "gzip"}
+    first = client.get("/v1/events/", headers=headers)
+    assert first.headers["etag"].endswith('-gz"')
+    second = client.get(
+        "/v1/events/", headers={**headers, "If-None-Match": first.headers["etag"]}
+    )
+    assert second.status_code == 304
+
+
+def test_if_modified_since(store):
+    last_modified = client.get("/v1/events/").headers["last-modified"]
+    response = client.get("/v1/events/", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+    response = client.get(
+        "/v1/events/", headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"}
+    )
+    assert response.status_code == 200
+
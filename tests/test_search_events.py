@@ -0,0 +1,103 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def events(make_event):
+    return [
+        make_event(
+            1,
+            "2024-05-03 10:00:00",
+            end_date="2024-05-05 20:00:00",
+            summary="Salón del Cómic",
+            province="Barcelona",
+            community="Cataluña",
+            city="Barcelona",
+        ),
+        make_event(2, "2024-06-12 18:00:00", summary="Firma de Paco", type="Firma"),
+        make_event(
+            3,
+            "2024-09-20 10:00:00",
+            summary="Jornadas del Cómic",
+            province="Málaga",
+            community="Andalucía",
+            city="Málaga",
+        ),
+    ]
+
+
+def search(**params):
+    return client.get("/v1/events/search/", params=params)
+
+
+def test_search_by_province_ignores_accents(store):
+    response = search(province="malaga")
+    assert response.status_code == 200
+    assert [event["id"] for event in response.json()["events"]] == [3]
+
+
+def test_search_by_partial_community(store):
+    response = search(community="comunidad")
+    assert [event["id"] for event in response.json()["events"]] == [2]
+
+
+def test_search_combines_filters(store):
+    response = search(summary="comic", city="barcelona")
+    assert [event["id"] for event in response.json()["events"]] == [1]
+    assert search(summary="comic", type="firma").status_code == 404
+
+
+def test_search_sorted_by_start_date(store):
+    response = search()
+    data = response.json()
+    assert data["total"] == 3
+    assert [event["id"] for event in data["events"]] == [3, 2, 1]
+
+
+def test_search_by_date_range(store):
+    response = search(start_date="2024-05-04", end_date="2024-06-30")
+    assert [event["id"] for event in response.json()["events"]] == [2, 1]
+    response = search(start_date="2024-06-01", province="madrid")
+    assert [event["id"] for event in response.json()["events"]] == [2]
+    assert search(end_date="2024-01-01").status_code == 404
+
+
+def test_search_cursor_pagination_is_stable(store, make_event):
+    first = search(limit=1).json()
+    assert [event["id"] for event in first["events"]] == [3]
+    # Un alta anterior al cursor no desplaza la página siguiente
+    store.upsert(make_event(4, "2024-12-01 10:00:00"))
+    second = search(limit=1, cursor=first["next_cursor"]).json()
+    assert [event["id"] for event in second["events"]] == [2]
+    third = search(limit=1, cursor=second["next_cursor"]).json()
+    assert [event["id"] for event in third["events"]] == [1]
+    assert third["next_cursor"] is None
+
+
+def test_search_cursor_with_filters(store):
+    first = search(summary="comic", limit=1).json()
+    assert first["total"] == 2
+    second = search(summary="comic", limit=1, cursor=first["next_cursor"]).json()
+    assert [event["id"] for event in second["events"]] == [1]
+    assert second["next_cursor"] is None
+
+
+def test_cursor_pagination_by_id(store):
+    first = client.get("/v1/events/", params={"limit": 2}).json()
+    assert [event["id"] for event in first["events"]] == [3, 2]
+    store.remove(3)
+    second = client.get(
+        "/v1/events/", params={"limit": 2, "cursor": first["next_cursor"]}
+    ).json()
+    assert [event["id"] for event in second["events"]] == [1]
+    assert second["next_cursor"] is None
+
+
+def test_invalid_cursor(store):
+    assert search(cursor="no-es-un-cursor").status_code == 400
+    # Un cursor del listado por id no vale para la búsqueda
+    first = client.get("/v1/events/", params={"limit": 1}).json()
+    assert search(cursor=first["next_cursor"]).status_code == 400
@@ -0,0 +1,66 @@
+import json
+import time
+from app.models.events import Event
+from app.utils import serializer
+
+
+def test_dump_events_matches_stdlib_format(make_event, monkeypatch):
+    monkeypatch.setattr(serializer, "CHUNK_SIZE", 3)
+    events = [
+        make_event(event_id, "2024-01-01 10:00:00", summary='Salón "Cómic"\n')
+        for event_id in range(7)
+    ]
+    data = [event.model_dump() for event in events]
+    expected = json.dumps(data, ensure_ascii=False, indent=4).encode()
+    assert serializer.dump_events(events, indent=4) == expected
+    assert json.loads(serializer.dump_events(events)) == data
+    assert serializer.dump_events([], indent=4) == b"[]"
+
+
+def test_load_events_without_orjson(make_event, monkeypatch):
+    monkeypatch.setattr(serializer, "orjson", None)
+    monkeypatch.setattr(serializer, "CHUNK_SIZE", 2)
+    data = [
+        make_event(event_id, "2024-01-01 10:00:00").model_dump()
+        for event_id in range(5)
+    ]
+    # Los eventos antiguos pueden no tener update_date
+    del data[0]["update_date"]
+    events = serializer.load_events(serializer.dumps(data))
+    assert [event.id for event in events] == list(range(5))
+    assert events[0].update_date == serializer.DEFAULT_UPDATE_DATE
+    assert serializer.dumps({"a": "ñ"}) == '{"a":"ñ"}'.encode()
+
+
+def test_load_events_speed(make_event):
+    """Benchmark: carga en bloque frente a json.load + Event(**) por evento."""
+    raw = serializer.dump_events(
+        [
+            make_event(event_id, "2024-01-01 10:00:00", description="x" * 300)
+            for event_id in range(20000)
+        ],
+        indent=4,
+    )
+
+    def best_time(load):
+        # El mejor de varios intentos, para que una pausa puntual no decida
+        times = []
+        for _ in range(3):
+            start = time.perf_counter()
+            result = load()
+            times.append(time.perf_counter() - start)
+        return result, min(times)
+
+    old, old_time = best_time(
+        lambda: [Event(**event_data) for event_data in json.loads(raw)]
+    )
+    new, new_time = best_time(lambda: serializer.load_events(raw))
+    print(
+        f"\nload 20000 events: json + Event(**) {old_time * 1000:.0f} ms, "
+        f"serializer {new_time * 1000:.0f} ms "
+        f"(orjson {'sí' if serializer.orjson else 'no'})"
+    )
+    assert new == old
+    # Con tiempos de reloj solo se detecta una regresión clara: la diferencia
+    # real depende de la máquina y de lo que se ejecute a la vez
+    assert new_time < old_time * 1.5
@@ -0,0 +1,124 @@
+import asyncio
+import gzip
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils import snapshot
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def events(make_event):
+    return [
+        make_event(event_id, "2024-05-03 10:00:00", description="x" * 200)
+        for event_id in range(1, 11)
+    ]
+
+
+def rebuild(store):
+    """Espera a que se genere la instantánea de la versión actual."""
+
+    async def scenario():
+        await snapshot.get_snapshot(store)
+        if snapshot.build_task is not None and not snapshot.build_task.done():
+            await snapshot.build_task
+
+    asyncio.run(scenario())
+
+
+def test_static_events_served_precompressed(store, monkeypatch):
+    response = client.get("/static-events", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "max-age" in response.headers["cache-control"]
+    events = response.json()
+    assert [event["id"] for event in events] == list(range(1, 11))
+
+    # Misma versión: no se vuelve a generar
+    def fail(*args):
+        raise AssertionError("no debería regenerarse")
+
+    monkeypatch.setattr(snapshot, "build_snapshot", fail)
+    plain = client.get("/static-events", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert json.loads(plain.content) == events
+    # JSON minificado
+    assert b", " not in plain.content[:20]
+
+
+def test_static_events_conditional(store):
+    first = client.get("/static-events")
+    response = client.get(
+        "/static-events", headers={"If-None-Match": first.headers["etag"]}
+    )
+    assert response.status_code == 304
+    store.remove(1)
+    rebuild(store)
+    response = client.get(
+        "/static-events", headers={"If-None-Match": first.headers["etag"]}
+    )
+    assert response.status_code == 200
+    assert len(response.json()) == 9
+
+
+def test_old_snapshots_removed(store, tmp_path):
+    client.get("/static-events")
+    store.remove(1)
+    rebuild(store)
+    store.remove(2)
+    rebuild(store)
+    directory = snapshot.process_dir()
+    names = {path.name.split(".")[0] for path in Path(directory).iterdir()}
+    # La versión actual y la anterior
+    assert len(names) == 2
+    path = snapshot.current.paths["gzip"]
+    assert len(json.loads(gzip.decompress(open(path, "rb").read()))) == 8
+
+
+def test_snapshots_of_other_workers_kept(store, tmp_path):
+    # Otro worker con la misma versión de los datos sirve sus propios ficheros
+    client.get("/static-events")
+    other = tmp_path / "snapshot" / "other-worker"
+    other.mkdir()
+    served = other / os.path.basename(snapshot.current.paths["gzip"])
+    served.write_bytes(b"")
+    store.remove(1)
+    rebuild(store)
+    store.remove(2)
+    rebuild(store)
+    assert served.exists()
+
+
+def test_stale_snapshot_served_while_building(store):
+    async def scenario():
+        first = await snapshot.get_snapshot(store)
+        store.remove(1)
+        # No se espera a la nueva: se sirve la anterior mientras se genera
+        assert await snapshot.get_snapshot(store) is first
+        assert await snapshot.get_snapshot(store) is first
+        await snapshot.build_task
+        assert (await snapshot.get_snapshot(store)).version == store.version
+
+    asyncio.run(scenario())
+
+
+def test_snapshots_of_finished_workers_removed(store, tmp_path):
+    finished = subprocess.run(
+        [sys.executable, "-c", "import os; print(os.getpid())"],
+        capture_output=True,
+        text=True,
+    )
+    dead = tmp_path / "snapshot" / finished.stdout.strip()
+    alive = tmp_path / "snapshot" / str(os.getppid())
+    for directory in (dead, alive):
+        directory.mkdir(parents=True)
+        (directory / "events-1.json").write_bytes(b"[]")
+    client.get("/static-events")
+    assert not dead.exists()
+    assert alive.exists()
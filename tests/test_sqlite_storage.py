@@ -0,0 +1,63 @@
+import asyncio
+import json
+import pytest
+from app.utils import file_operations, sqlite_storage
+
+
+@pytest.fixture
+def sqlite_backend(monkeypatch, tmp_path):
+    monkeypatch.setattr(file_operations, "storage_backend", "sqlite")
+    monkeypatch.setattr(
+        file_operations, "events_file_path", str(tmp_path / "events.json")
+    )
+    monkeypatch.setattr(
+        file_operations, "sqlite_file_path", str(tmp_path / "events.db")
+    )
+    return tmp_path
+
+
+def test_migrate_from_json(tmp_path, make_event):
+    json_path = tmp_path / "events.json"
+    events = [make_event(1, "2024-01-01 10:00:00"), make_event(2, "2024-02-01 10:00:00")]
+    json_path.write_text(json.dumps([event.model_dump() for event in events]))
+    db_path = str(tmp_path / "events.db")
+    assert sqlite_storage.migrate_from_json(str(json_path), db_path) == 2
+    assert sqlite_storage.read_events(db_path) == events
+
+
+def test_event_changes(tmp_path, make_event):
+    db_path = str(tmp_path / "events.db")
+    sqlite_storage.write_events(
+        db_path,
+        [
+            make_event(1, "2024-01-01 10:00:00", summary="Salón del Cómic"),
+            make_event(2, "2024-02-01 10:00:00", description="Firma de cómics"),
+        ],
+    )
+    sqlite_storage.write_event_changes(
+        db_path,
+        upserted=[make_event(1, "2024-01-01 10:00:00", summary="Expo manga")],
+        deleted=[2],
+    )
+    assert [event.summary for event in sqlite_storage.read_events(db_path)] == [
+        "Expo manga"
+    ]
+
+
+def test_sqlite_backend_through_file_operations(sqlite_backend, make_event):
+    # El primer arranque migra el events.json existente
+    (sqlite_backend / "events.json").write_text(
+        json.dumps([make_event(1, "2024-01-01 10:00:00").model_dump()])
+    )
+    assert [event.id for event in file_operations.read_stored_events()] == [1]
+
+    new_event = make_event(2, "2024-02-01 10:00:00")
+    asyncio.run(file_operations.save_event_changes(upserted=[new_event]))
+    assert not (sqlite_backend / "events.json.journal").exists()
+    events = file_operations.read_stored_events()
+    assert [event.id for event in events] == [1, 2]
+
+    # La exportación mantiene events.json compatible con /static-events
+    asyncio.run(file_operations.compact_events(events))
+    exported = json.loads((sqlite_backend / "events.json").read_text())
+    assert [event["id"] for event in exported] == [1, 2]
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import pytest
+from app.utils import cache, file_operations, write_coordinator
+
+
+@pytest.fixture
+def events_file(events_file, monkeypatch):
+    events_file(1)
+    # Solo cuenta la notificación entre workers, no la comprobación periódica
+    monkeypatch.setattr(cache, "CHECK_INTERVAL", float("inf"))
+    monkeypatch.setattr(cache, "schedule_compaction", lambda: None)
+    return events_file
+
+
+def test_ids_never_repeat(events_file):
+    async def scenario():
+        async with write_coordinator.write_lock():
+            assert await write_coordinator.allocate_ids(3) == 3
+            # Aunque se borre el evento 3, no se vuelve a usar su id
+            assert await write_coordinator.allocate_ids(3, 2) == 4
+            assert await write_coordinator.allocate_ids(10) == 10
+
+    asyncio.run(scenario())
+
+
+def test_write_lock_excludes_other_processes(events_file):
+    fcntl = pytest.importorskip("fcntl")
+
+    async def scenario():
+        async with write_coordinator.write_lock():
+            fd = os.open(write_coordinator.lock_file_path(), os.O_RDWR)
+            try:
+                with pytest.raises(BlockingIOError):
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            finally:
+                os.close(fd)
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_creates_get_distinct_ids(events_file, make_event):
+    async def create():
+        async with cache.write_transaction() as store:
+            event_id = await write_coordinator.allocate_ids(store.max_id() + 1)
+            # Otra petición intenta entrar mientras tanto
+            await asyncio.sleep(0)
+            event = make_event(event_id, "2024-02-01 10:00:00")
+            store.upsert(event)
+            await cache.persist_event_changes(upserted=[event])
+            return event_id
+
+    async def scenario():
+        return await asyncio.gather(*(create() for _ in range(3)))
+
+    assert sorted(asyncio.run(scenario())) == [2, 3, 4]
+    ids = [event.id for event in file_operations.read_events_file()]
+    assert sorted(ids) == [1, 2, 3, 4]
+
+
+def test_other_worker_writes_are_seen_immediately(events_file, make_event):
+    async def scenario():
+        store = await cache.get_event_store()
+        # Escritura de otro worker: diario más notificación
+        await file_operations.save_event_changes(
+            upserted=[make_event(2, "2024-02-01 10:00:00")]
+        )
+        write_coordinator.notify_change()
+        # Se sigue sirviendo la caché mientras se recarga
+        assert await cache.get_event_store() is store
+        await cache.reload_task
+        reloaded = await cache.get_event_store()
+        assert reloaded.get(2) is not None
+
+        # Las escrituras propias no provocan recarga
+        async with cache.write_transaction() as current:
+            current.upsert(make_event(3, "2024-02-01 10:00:00"))
+            await cache.persist_event_changes(upserted=[current.get(3)])
+        assert await cache.get_event_store() is current
+
+    asyncio.run(scenario())
+
+
+def test_write_transaction_refreshes_stale_store(events_file, make_event):
+    async def scenario():
+        store = await cache.get_event_store()
+        await file_operations.save_event_changes(
+            upserted=[make_event(2, "2024-02-01 10:00:00")]
+        )
+        write_coordinator.notify_change()
+        async with cache.write_transaction() as current:
+            assert current is not store
+            assert current.max_id() == 2
+
+    asyncio.run(scenario())